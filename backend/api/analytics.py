@@ -4,12 +4,18 @@ Provides comprehensive waste reduction and CO2 impact metrics
 """
 from flask import Blueprint, jsonify, request
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.log import get_logger
+
+logger = get_logger('analytics')
+
 try:
     from utils.waste_impact import (
         calculate_impact_metrics,
@@ -159,20 +165,31 @@ def get_waste_analytics():
         # Get comprehensive metrics
         metrics = calculate_impact_metrics(start_date, end_date, store_id)
         
-        # Also include legacy format for backward compatibility
-        waste_logs = WasteLog.query.filter(
-            WasteLog.logged_at >= start_date,
-            WasteLog.logged_at <= end_date
-        ).all()
-        
-        if store_id:
-            waste_logs = [w for w in waste_logs if w.inventory and w.inventory.store_id == store_id]
+        # Also include legacy format for backward compatibility.
+        # Totals are aggregated in SQL; only the 10 displayed logs are loaded.
+        def window_logs(query):
+            query = query.filter(
+                WasteLog.logged_at >= start_date,
+                WasteLog.logged_at <= end_date
+            )
+            if store_id:
+                query = query.join(WasteLog.inventory).filter(FruitInventory.store_id == store_id)
+            return query
+        
+        total_wasted, total_value_loss = window_logs(db.session.query(
+            func.coalesce(func.sum(WasteLog.quantity_wasted), 0),
+            func.coalesce(func.sum(WasteLog.estimated_value_loss), 0)
+        ).select_from(WasteLog)).one()
+        
+        waste_logs = window_logs(WasteLog.query).options(
+            selectinload(WasteLog.inventory)
+        ).order_by(WasteLog.id.desc()).limit(10).all()
         
         return jsonify({
             # Legacy format
-            'total_wasted': sum(log.quantity_wasted for log in waste_logs),
-            'total_value_loss': sum(log.estimated_value_loss or 0 for log in waste_logs),
-            'waste_logs': [log.to_dict() for log in waste_logs[:10]],
+            'total_wasted': total_wasted,
+            'total_value_loss': total_value_loss,
+            'waste_logs': [log.to_dict() for log in waste_logs],
             
             # Enhanced metrics
             'waste_prevented_kg': metrics['waste_prevented_kg'],
@@ -302,8 +319,8 @@ def get_detailed_metrics():
                 return jsonify({'error': 'No customer found in database'}), 400
             user_id = default_customer.id
         
-        # Query inventory
-        query = FruitInventory.query.filter(FruitInventory.quantity > 0)
+        # Query inventory (freshness is read per item below and by the estimator)
+        query = FruitInventory.query.options(selectinload(FruitInventory.freshness)).filter(FruitInventory.quantity > 0)
         if store_id:
             query = query.filter(FruitInventory.store_id == store_id)
         
@@ -398,18 +415,12 @@ def get_aggregate_metrics():
         store_id = request.args.get('store_id', type=int)
         user_id = request.args.get('user_id', type=int)
         
-        # Debug logging (wrapped in try-except to prevent I/O errors)
-        try:
-            print(f"🔍 [Analytics] Computing aggregate metrics - store_id: {store_id}, user_id: {user_id}")
-        except:
-            pass
+        # Debug logging (logging swallows stream I/O errors itself)
+        logger.debug("🔍 [Analytics] Computing aggregate metrics - store_id: %s, user_id: %s", store_id, user_id)
         
         metrics = compute_aggregate_impact(store_id=store_id, user_id=user_id)
         
-        try:
-            print(f"🔍 [Analytics] Metrics computed: {metrics}")
-        except:
-            pass
+        logger.debug("🔍 [Analytics] Metrics computed: %s", metrics)
         
         # Add human-readable conversions
         metrics['waste_saved_lbs'] = round(metrics.get('waste_saved_kg', metrics['units_saved']) * 2.20462, 2)
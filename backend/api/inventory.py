@@ -2,13 +2,23 @@
 
 from flask import jsonify, request, Response, stream_with_context
 from datetime import datetime
-from models import db, Store, FruitInventory, QuantityChangeLog
-from utils.helpers import notify_quantity_change, broadcast_to_admins
-import json
+from models import db, Store, FruitInventory, FreshnessStatus, QuantityChangeLog
+from database import commit_session
+from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager, load_only
+from utils.helpers import notify_quantity_change, broadcast_to_admins, broadcast_to_admins_coalesced, sse_event, stream_json_list
+from utils.response_cache import cached
+from utils.log import get_logger
+import logging
 import cv2
 from pathlib import Path
 from blemish_detection.blemish import detect_blemishes
-from utils.image_storage import DETECTION_IMAGES_DIR, get_category_images, mark_image_as_processed, save_processed_image
+from utils.image_storage import DETECTION_IMAGES_DIR, get_category_images, mark_image_as_processed, save_processed_image, write_metadata
+
+logger = get_logger('inventory')
+
+# Rows fetched per round-trip when streaming GET /api/inventory
+INVENTORY_STREAM_BATCH = 200
 
 # Import the global memory cache from main (we'll access it via app context)
 # Note: This will be set up when routes are registered
@@ -47,6 +57,7 @@ def register_inventory_routes(app):
     """Register inventory management routes"""
     
     @app.route('/api/stores', methods=['GET'])
+    @cached(ttl=30)
     def get_stores():
         """Get all stores"""
         try:
@@ -66,32 +77,41 @@ def register_inventory_routes(app):
             fruit_type = request.args.get('fruit_type')
             status = request.args.get('status')  # fresh, ripe, clearance
             min_discount = request.args.get('min_discount', type=float)
-            
-            query = FruitInventory.query
+            summary = request.args.get('view') == 'summary'  # only list columns
+            
+            if summary:
+                # Project just the list columns; freshness is only joined for filtering
+                query = FruitInventory.query.outerjoin(FruitInventory.freshness).options(
+                    load_only(
+                        FruitInventory.id, FruitInventory.store_id, FruitInventory.fruit_type,
+                        FruitInventory.quantity, FruitInventory.original_price,
+                        FruitInventory.current_price, FruitInventory.thumbnail_path
+                    )
+                )
+            else:
+                # Load freshness in the same SELECT so to_dict() doesn't lazy-load per row
+                query = FruitInventory.query.outerjoin(FruitInventory.freshness).options(
+                    contains_eager(FruitInventory.freshness)
+                )
             
             if store_id:
-                query = query.filter_by(store_id=store_id)
+                query = query.filter(FruitInventory.store_id == store_id)
             if fruit_type:
-                query = query.filter_by(fruit_type=fruit_type)
-            
-            items = query.all()
-            
-            # Apply freshness filters
-            if status or min_discount is not None:
-                filtered_items = []
-                for item in items:
-                    if item.freshness:
-                        if status and item.freshness.status != status:
-                            continue
-                        if min_discount is not None and item.freshness.discount_percentage < min_discount:
-                            continue
-                    filtered_items.append(item)
-                items = filtered_items
-            
-            return jsonify({
-                'count': len(items),
-                'items': [item.to_dict() for item in items]
-            }), 200
+                query = query.filter(FruitInventory.fruit_type == fruit_type)
+            
+            # Apply freshness filters (items without freshness data are kept)
+            if status:
+                query = query.filter(or_(FreshnessStatus.id.is_(None), FreshnessStatus.status == status))
+            if min_discount is not None:
+                query = query.filter(or_(
+                    FreshnessStatus.id.is_(None),
+                    FreshnessStatus.discount_percentage >= min_discount
+                ))
+            
+            # Stream the list in chunks so large inventories aren't materialized as
+            # ORM objects + dicts before the first byte; query errors still become a 500 below
+            serialize = (lambda item: item.to_dict_list()) if summary else (lambda item: item.to_dict())
+            return stream_json_list('items', query.yield_per(INVENTORY_STREAM_BATCH), serialize), 200
         
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -123,7 +143,7 @@ def register_inventory_routes(app):
             )
             
             db.session.add(item)
-            db.session.commit()
+            commit_session()
             
             # Notify about quantity change (new item = increase from 0)
             item_data = notify_quantity_change(item, 0, item.quantity)
@@ -167,7 +187,7 @@ def register_inventory_routes(app):
                 item.current_price = data['current_price']
             
             item.updated_at = datetime.utcnow()
-            db.session.commit()
+            commit_session()
             
             # Notify about quantity change if it changed
             update_data = notify_quantity_change(item, old_quantity, item.quantity)
@@ -190,7 +210,7 @@ def register_inventory_routes(app):
         try:
             item = FruitInventory.query.get_or_404(item_id)
             db.session.delete(item)
-            db.session.commit()
+            commit_session()
             
             broadcast_to_admins('inventory_deleted', {'id': item_id})
             
@@ -222,7 +242,7 @@ def register_inventory_routes(app):
             # Add score to the list
             item.add_actual_freshness_score(score)
             item.updated_at = datetime.utcnow()
-            db.session.commit()
+            commit_session()
             
             # Broadcast update to admin dashboards
             broadcast_to_admins('inventory_updated', item.to_dict())
@@ -243,7 +263,7 @@ def register_inventory_routes(app):
         def generate():
             try:
                 # Send initial connection message
-                yield f"data: {json.dumps({'type': 'connected', 'message': 'SSE connection established'})}\n\n"
+                yield sse_event({'type': 'connected', 'message': 'SSE connection established'})
                 
                 with app.app_context():
                     # Get memory cache from app config
@@ -252,11 +272,12 @@ def register_inventory_routes(app):
                     # Get all inventory items that don't have actual freshness scores
                     items = FruitInventory.query.all()
                     
-                    print(f"\n🔍 [Analyze] Checking all inventory items:")
-                    for item in items:
-                        scores = item.get_actual_freshness_scores()
-                        avg = item.get_actual_freshness_avg()
-                        print(f"  - {item.fruit_type} (ID: {item.id}): {len(scores) if scores else 0} scores, avg: {avg}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("🔍 [Analyze] Checking all inventory items:")
+                        for item in items:
+                            scores = item.get_actual_freshness_scores()
+                            avg = item.get_actual_freshness_avg()
+                            logger.debug("  - %s (ID: %s): %s scores, avg: %s", item.fruit_type, item.id, len(scores) if scores else 0, avg)
                     
                     items_to_process = [
                         item for item in items 
@@ -265,13 +286,14 @@ def register_inventory_routes(app):
                     
                     total_items = len(items_to_process)
                     
-                    print(f"\n📋 [Analyze] Items to process ({total_items}): {[item.fruit_type for item in items_to_process]}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("📋 [Analyze] Items to process (%s): %s", total_items, [item.fruit_type for item in items_to_process])
                     
                     if total_items == 0:
-                        yield f"data: {json.dumps({'type': 'complete', 'progress': 100, 'message': 'All items already analyzed'})}\n\n"
+                        yield sse_event({'type': 'complete', 'progress': 100, 'message': 'All items already analyzed'})
                         return
                     
-                    yield f"data: {json.dumps({'type': 'start', 'total': total_items, 'message': f'Analyzing {total_items} items...'})}\n\n"
+                    yield sse_event({'type': 'start', 'total': total_items, 'message': f'Analyzing {total_items} items...'})
                     
                     for idx, item in enumerate(items_to_process):
                         fruit_type = item.fruit_type.lower()
@@ -289,8 +311,8 @@ def register_inventory_routes(app):
                         if not detection_images:
                             # Send progress update after completion (even if no images)
                             progress_after = int(((idx + 1) / total_items) * 100)
-                            yield f"data: {json.dumps({'type': 'progress', 'progress': progress_after, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Completed {item.fruit_type}'})}\n\n"
-                            yield f"data: {json.dumps({'type': 'item_complete', 'item': item.fruit_type, 'message': f'No processed images found for {item.fruit_type}'})}\n\n"
+                            yield sse_event({'type': 'progress', 'progress': progress_after, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Completed {item.fruit_type}'})
+                            yield sse_event({'type': 'item_complete', 'item': item.fruit_type, 'message': f'No processed images found for {item.fruit_type}'})
                             continue
                         
                         # Process each processed image
@@ -305,16 +327,16 @@ def register_inventory_routes(app):
                             
                             # Send granular progress update for each image
                             image_progress = int((idx + (img_idx / len(detection_images))) / total_items * 100)
-                            yield f"data: {json.dumps({'type': 'progress', 'progress': image_progress, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Processing {item.fruit_type} ({img_idx + 1}/{len(detection_images)})...'})}\n\n"
+                            yield sse_event({'type': 'progress', 'progress': image_progress, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Processing {item.fruit_type} ({img_idx + 1}/{len(detection_images)})...'})
                             
                             # Run blemish detection if not already done
                             blemishes_data = None
                             if img_info.get('metadata') and 'blemishes' in img_info['metadata']:
                                 blemishes_data = img_info['metadata']['blemishes']
-                                print(f"📊 [Analyze] Using existing blemish data for {img_info['filename']}")
+                                logger.debug("📊 [Analyze] Using existing blemish data for %s", img_info['filename'])
                             else:
                                 try:
-                                    print(f"🔍 [Analyze] Running blemish detection on {img_info['filename']}")
+                                    logger.debug("🔍 [Analyze] Running blemish detection on %s", img_info['filename'])
                                     blemish_result = detect_blemishes(str(image_path))
                                     blemishes_data = {
                                         'bboxes': blemish_result['bboxes'],
@@ -326,18 +348,16 @@ def register_inventory_routes(app):
                                     if not img_info.get('metadata'):
                                         img_info['metadata'] = {}
                                     img_info['metadata']['blemishes'] = blemishes_data
-                                    metadata_path = image_path.with_suffix('.json')
-                                    with open(metadata_path, 'w') as f:
-                                        json.dump(img_info['metadata'], f, indent=2, default=str)
-                                    print(f"✅ [Analyze] Saved blemish data for {img_info['filename']}")
+                                    write_metadata(image_path.with_suffix('.json'), img_info['metadata'])
+                                    logger.debug("✅ [Analyze] Saved blemish data for %s", img_info['filename'])
                                         
                                 except Exception as e:
                                     print(f"❌ [Analyze] Error detecting blemishes for {image_path}: {e}")
                                     continue
                             
                             # Calculate actual freshness score
-                            print(f"💯 [Analyze] Calculating freshness score for {img_info['filename']}")
-                            print(f"    Blemishes data: {blemishes_data}")
+                            logger.debug("💯 [Analyze] Calculating freshness score for %s", img_info['filename'])
+                            logger.debug("    Blemishes data: %s", blemishes_data)
                             
                             if blemishes_data and blemishes_data.get('bboxes'):
                                 # Load image to get dimensions
@@ -364,7 +384,7 @@ def register_inventory_routes(app):
                                     total_penalty = count_penalty + coverage_penalty
                                     freshness_score = max(0, 1.0 - total_penalty)
                                     
-                                    print(f"    Calculated score: {freshness_score:.3f} (blemishes: {blemish_count}, coverage: {blemish_cover_percent:.2f}%)")
+                                    logger.debug("    Calculated score: %.3f (blemishes: %s, coverage: %.2f%%)", freshness_score, blemish_count, blemish_cover_percent)
                                     scores.append(freshness_score)
                                 else:
                                     print(f"⚠️  [Analyze] Could not load image: {image_path}")
@@ -372,36 +392,38 @@ def register_inventory_routes(app):
                                 print(f"⚠️  [Analyze] No blemish bboxes found for {img_info['filename']}")
                         
                         # Save scores to database
-                        print(f"💾 [Analyze] Saving {len(scores)} scores for {item.fruit_type} (ID: {item.id})")
+                        logger.debug("💾 [Analyze] Saving %s scores for %s (ID: %s)", len(scores), item.fruit_type, item.id)
                         if scores:
                             for score in scores:
-                                print(f"    Adding score: {score:.3f}")
+                                logger.debug("    Adding score: %.3f", score)
                                 item.add_actual_freshness_score(score)
                             item.updated_at = datetime.utcnow()
                             
-                            print(f"    Before commit - scores: {item.get_actual_freshness_scores()}")
-                            db.session.commit()
-                            print(f"    After commit - avg: {item.get_actual_freshness_avg()}")
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("    Before commit - scores: %s", item.get_actual_freshness_scores())
+                            commit_session()
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("    After commit - avg: %s", item.get_actual_freshness_avg())
                             
-                            # Broadcast update
-                            broadcast_to_admins('inventory_updated', item.to_dict())
+                            # Broadcast update (coalesced: the analysis finishes items in quick succession)
+                            broadcast_to_admins_coalesced('inventory_updated', item.to_dict())
                             
                             # Send progress update after completion
                             progress_after = int(((idx + 1) / total_items) * 100)
-                            yield f"data: {json.dumps({'type': 'progress', 'progress': progress_after, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Completed {item.fruit_type}'})}\n\n"
-                            yield f"data: {json.dumps({'type': 'item_complete', 'item': item.fruit_type, 'scores_count': len(scores), 'average': item.get_actual_freshness_avg()})}\n\n"
+                            yield sse_event({'type': 'progress', 'progress': progress_after, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Completed {item.fruit_type}'})
+                            yield sse_event({'type': 'item_complete', 'item': item.fruit_type, 'scores_count': len(scores), 'average': item.get_actual_freshness_avg()})
                         else:
                             print(f"⚠️  [Analyze] No scores calculated for {item.fruit_type}")
                             # Send progress update after completion (even if no scores)
                             progress_after = int(((idx + 1) / total_items) * 100)
-                            yield f"data: {json.dumps({'type': 'progress', 'progress': progress_after, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Completed {item.fruit_type}'})}\n\n"
-                            yield f"data: {json.dumps({'type': 'item_complete', 'item': item.fruit_type, 'message': 'No valid scores calculated'})}\n\n"
+                            yield sse_event({'type': 'progress', 'progress': progress_after, 'current': idx + 1, 'total': total_items, 'item': item.fruit_type, 'message': f'Completed {item.fruit_type}'})
+                            yield sse_event({'type': 'item_complete', 'item': item.fruit_type, 'message': 'No valid scores calculated'})
                     
                     # Final completion
-                    yield f"data: {json.dumps({'type': 'complete', 'progress': 100, 'message': 'Analysis complete!'})}\n\n"
+                    yield sse_event({'type': 'complete', 'progress': 100, 'message': 'Analysis complete!'})
                     
             except Exception as e:
-                yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                yield sse_event({'type': 'error', 'error': str(e)})
         
         response = Response(
             stream_with_context(generate()),
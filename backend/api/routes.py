@@ -1,8 +1,10 @@
 """Basic routes for SusCart API"""
 
-from flask import jsonify, send_from_directory
+from flask import Response, send_from_directory
 import os
 
+from utils.helpers import json_dumps
+
 
 def register_basic_routes(app):
     """Register basic routes"""
@@ -12,9 +14,11 @@ def register_basic_routes(app):
         """Serve the WebSocket test client"""
         return send_from_directory(os.path.dirname(__file__), '../ws_test_client.html')
     
-    @app.route('/routes', methods=['GET'])
-    def list_routes():
-        """List all available routes and WebSocket endpoints"""
+    # Routes and health fields are fixed once startup finishes, so these bodies
+    # are built on the first request (after every blueprint is registered) and reused
+    routes_cache = {}
+    
+    def _build_routes_json():
         routes = []
         for rule in app.url_map.iter_rules():
             if rule.endpoint != 'static':
@@ -25,23 +29,35 @@ def register_basic_routes(app):
                 })
         
         port = os.getenv('PORT', 3000)
-        return jsonify({
+        return json_dumps({
             'api_routes': sorted(routes, key=lambda x: x['path']),
             'websockets': [
             f'ws://localhost:{port}/ws/admin - Admin dashboard updates',
             f'ws://localhost:{port}/ws/customer/<customer_id> - Customer notifications',
             f'ws://localhost:{port}/ws/stream_video - Video stream'
             ]
-        }), 200
+        })
+    
+    @app.route('/routes', methods=['GET'])
+    def list_routes():
+        """List all available routes and WebSocket endpoints"""
+        if 'json' not in routes_cache:
+            routes_cache['json'] = _build_routes_json()
+        return Response(routes_cache['json'], mimetype='application/json'), 200
     
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint"""
-        knot_client = getattr(app, 'knot_client', None)
-        return jsonify({
-            'status': 'healthy',
-            'message': 'SusCart backend is running',
-            'database': 'connected',
-            'knot_api': 'mock' if knot_client and hasattr(knot_client, 'mock_data') else 'connected'
-        }), 200
-
+        if 'health' not in routes_cache:
+            # Every field is fixed at startup, so the body is built once
+            knot_is_mock = app.config.get('KNOT_IS_MOCK')
+            if knot_is_mock is None:
+                knot_client = getattr(app, 'knot_client', None)
+                knot_is_mock = bool(knot_client and hasattr(knot_client, 'mock_data'))
+            routes_cache['health'] = json_dumps({
+                'status': 'healthy',
+                'message': 'SusCart backend is running',
+                'database': 'connected',
+                'knot_api': 'mock' if knot_is_mock else 'connected'
+            })
+        return Response(routes_cache['health'], mimetype='application/json'), 200
@@ -3,6 +3,7 @@ Blemish detection using Google Gemini Robotics ER 1.5 Preview model.
 Detects blemishes or rot on food/fruit items using segmentation masks.
 """
 
+import io
 import json
 import os
 from typing import Dict, List, Optional
@@ -14,6 +15,22 @@ from PIL import Image, ImageDraw, ImageFont
 
 load_dotenv()
 
+# Longest side of the image sent to Gemini. Boxes come back normalised (0-1000),
+# so a smaller upload doesn't change the coordinates, only the request size.
+BLEMISH_UPLOAD_MAX_SIDE = int(os.getenv("BLEMISH_UPLOAD_MAX_SIDE", "768"))
+
+# Clients are reused across calls (keyed by API key) so each detection doesn't
+# pay for client construction and a fresh HTTP connection
+_clients = {}
+
+
+def _get_client(api_key: str) -> "genai.Client":
+    """Return a cached Gemini client for api_key"""
+    client = _clients.get(api_key)
+    if client is None:
+        client = _clients.setdefault(api_key, genai.Client(api_key=api_key))
+    return client
+
 
 def detect_blemishes(
     image_path: str,
@@ -48,12 +65,22 @@ def detect_blemishes(
             )
     
     # Initialize client
-    client = genai.Client(api_key=api_key)
+    client = _get_client(api_key)
     
-    # Load image
-    image = Image.open(image_path)
+    # Load image (Image.open only parses the header; pixels are decoded on first use)
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    image = Image.open(io.BytesIO(image_bytes))
     print(f"🔍 [Gemini] Starting blemish detection for image: {image_path}")
     
+    # An RGB JPEG that is already small enough is sent as the stored bytes,
+    # skipping the decode and JPEG re-encode the SDK would do for a PIL image
+    send_raw = (
+        image.format == "JPEG"
+        and image.mode == "RGB"
+        and max(image.size) <= BLEMISH_UPLOAD_MAX_SIDE
+    )
+    
     # Convert to RGB if necessary (for PNG with transparency)
     if image.mode != "RGB":
         image_rgb = Image.new("RGB", image.size, (255, 255, 255))
@@ -70,7 +97,14 @@ def detect_blemishes(
     
     # Prepare the request payload (similar to TypeScript version)
     # Create the content parts - PIL Images can be passed directly
-    contents = [image, prompt]
+    if send_raw:
+        upload = types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg")
+    else:
+        upload = image
+        if max(image.size) > BLEMISH_UPLOAD_MAX_SIDE:
+            upload = image.copy()
+            upload.thumbnail((BLEMISH_UPLOAD_MAX_SIDE, BLEMISH_UPLOAD_MAX_SIDE))
+    contents = [upload, prompt]
     
     # Generate content config with correct format
     generate_content_config = types.GenerateContentConfig(
@@ -9,7 +9,7 @@ import cv2
 import websockets
 import asyncio
 import json
-import base64
+import struct
 import time
 import os
 import sys
@@ -109,10 +109,10 @@ class CameraProxy:
             print("📹 Camera released")
     
     def encode_frame(self, frame):
-        """Encode frame as JPEG"""
+        """Encode frame as JPEG bytes"""
         encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
         _, buffer = cv2.imencode('.jpg', frame, encode_param)
-        return base64.b64encode(buffer).decode('utf-8')
+        return buffer.tobytes()
     
     async def connect_to_backend(self):
         """Connect to cloud backend WebSocket"""
@@ -160,16 +160,16 @@ class CameraProxy:
             return False
         
         try:
-            # Encode frame as base64 JPEG
             frame_data = self.encode_frame(frame)
             
-            # Send frame data
-            await self.ws.send(json.dumps({
+            # One binary message per frame: <uint32 LE meta length><meta JSON><JPEG>
+            # (same framing the backend uses for frontend frames; no base64)
+            meta = json.dumps({
                 'type': 'frame',
-                'data': frame_data,
                 'timestamp': datetime.utcnow().isoformat(),
                 'frame_id': self.frame_count
-            }))
+            }).encode('utf-8')
+            await self.ws.send(struct.pack('<I', len(meta)) + meta + frame_data)
             
             self.frame_count += 1
             return True
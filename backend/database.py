@@ -4,17 +4,107 @@ Database configuration and initialization
 
 from models import db, Store, FruitInventory, FreshnessStatus, Customer, PurchaseHistory, Recommendation, WasteLog, PriceCurve, UserDiscountStat, ProductLCA
 from datetime import datetime, timedelta
+from contextlib import contextmanager
+from sqlalchemy import event
 import random
+import threading
+
+
+# Pool sized so websocket, camera and request threads don't queue on one connection
+ENGINE_OPTIONS = {
+    'pool_size': 20,
+    'max_overflow': 40,
+    'pool_pre_ping': True
+}
+
+
+# SQLite allows one writer at a time. Request handlers, the camera writer and the
+# freshness flusher funnel their writes through this lock so they queue in-process
+# instead of contending on the database file lock (and hitting busy timeouts).
+# Reentrant so commit_session() can be called inside write_transaction().
+db_write_lock = threading.RLock()
+
+
+def commit_session():
+    """Flush and commit the current session while holding the process-wide write lock"""
+    with db_write_lock:
+        db.session.commit()
+
+
+@contextmanager
+def write_transaction():
+    """
+    Hold the write lock from the first write statement through commit (or rollback).
+    Use this around statements that execute before commit (bulk updates, Core
+    inserts, explicit flushes): SQLite takes its database lock at the first write,
+    so issuing them outside db_write_lock would block whoever holds it.
+    """
+    with db_write_lock:
+        try:
+            yield
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune each new SQLite connection for concurrent access:
+    WAL lets readers run during writes, synchronous=NORMAL is safe with WAL
+    and avoids an fsync per commit, busy_timeout waits instead of failing on locks.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
 
 
 def init_db(app):
     """Initialize the database with the Flask app"""
+    # In-memory SQLite uses a single-connection pool that doesn't take pool sizing
+    if ':memory:' not in app.config.get('SQLALCHEMY_DATABASE_URI', ''):
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', ENGINE_OPTIONS)
+    
     db.init_app(app)
     
     with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+        
         # Create all tables
         db.create_all()
         print("✅ Database tables created successfully")
+        
+        ensure_indexes()
+        
+        backfill_customer_favorites()
+
+
+def ensure_indexes():
+    """Create indexes added to models after their tables already existed (create_all skips them)"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def backfill_customer_favorites():
+    """
+    Populate customer_favorites from preferences JSON for customers that have no rows yet
+    (databases created before the table existed, or rows written outside set_preferences).
+    Runs on every startup so recommendation matching never misses a customer.
+    """
+    customers = Customer.query.filter(
+        Customer.preferences.isnot(None),
+        ~Customer.favorites.any()
+    ).all()
+    for customer in customers:
+        customer.sync_favorites(customer.get_preferences().get('favorite_fruits', []))
+    
+    if customers:
+        db.session.commit()
 
 
 def seed_sample_data(app):
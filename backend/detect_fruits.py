@@ -5,14 +5,84 @@ import torch
 import time
 import os
 import sys
+import threading
 from PIL import Image
 from torchvision import transforms
 from fresh_detector import load_model
 
-# Global YOLO model
-model = YOLO("yolov8l.pt") 
+# Optional TensorRT acceleration for the fresh model on CUDA
+try:
+    import torch_tensorrt
+    TENSORRT_AVAILABLE = True
+except ImportError:
+    TENSORRT_AVAILABLE = False
 
-def detect(image, allowed_classes=['*'], save=True, verbose=True):
+# Set FRESH_USE_TENSORRT=false to keep the eager PyTorch model on CUDA
+FRESH_USE_TENSORRT = os.getenv('FRESH_USE_TENSORRT', 'true').lower() == 'true'
+FRESH_MAX_BATCH = 16
+
+# Set FRESH_FP16=false to keep FP32 weights on CUDA when TensorRT isn't used
+FRESH_FP16 = os.getenv('FRESH_FP16', 'true').lower() == 'true'
+
+# Set FRESH_TORCH_COMPILE=true to torch.compile the model on CUDA when TensorRT isn't used
+# (CUDA graphs cut per-batch launch overhead; each batch size compiles once on first use)
+FRESH_TORCH_COMPILE = os.getenv('FRESH_TORCH_COMPILE', 'false').lower() == 'true'
+
+# Set FRESH_QUANTIZE_INT8=true to dynamically quantize the model's Linear head to INT8 on CPU.
+# Off by default: the conv backbone stays FP32 so the speedup is small, and the scores
+# (which drive discounts and prices) haven't been checked against the FP32 model.
+FRESH_QUANTIZE_INT8 = os.getenv('FRESH_QUANTIZE_INT8', 'false').lower() == 'true'
+
+# Longest side frames are shrunk to before YOLO when detect() is given max_side.
+# YOLO letterboxes to 640 anyway, so larger captures only add resize/plot work.
+DETECT_MAX_SIDE = int(os.getenv('DETECT_MAX_SIDE', 640))
+
+# Set YOLO_TENSORRT=true to run YOLO as a TensorRT FP16 engine on CUDA. The engine is
+# exported next to the weights on first use (this takes minutes) and reused afterwards.
+YOLO_TENSORRT = os.getenv('YOLO_TENSORRT', 'false').lower() == 'true'
+YOLO_WEIGHTS = "yolov8l.pt"
+
+# Global YOLO model, loaded on the first detect() call so importing this module
+# (e.g. for get_best_camera_index) doesn't load the weights
+model = None
+_model_lock = threading.Lock()
+
+
+def _load_yolo_tensorrt():
+    """
+    Load (exporting first if needed) a static-shape FP16 TensorRT engine of the YOLO weights.
+    
+    Returns:
+        YOLO: Engine-backed model, or None if TensorRT can't be used
+    """
+    if not torch.cuda.is_available():
+        print("⚠️ YOLO_TENSORRT is set but CUDA is not available; using PyTorch YOLO")
+        return None
+    try:
+        engine_path = os.path.splitext(YOLO_WEIGHTS)[0] + '.engine'
+        if not os.path.exists(engine_path):
+            print("⏳ Exporting YOLO to a TensorRT engine (one-time)...")
+            engine_path = YOLO(YOLO_WEIGHTS).export(format='engine', half=True, dynamic=False, imgsz=640)
+        yolo = YOLO(engine_path, task='detect')
+        print("✅ YOLO running as a TensorRT engine (FP16)")
+        return yolo
+    except Exception as e:
+        print(f"⚠️ YOLO TensorRT export failed, using PyTorch YOLO: {e}")
+        return None
+
+
+def get_yolo_model():
+    """Return the global YOLO model, loading it on first use"""
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                yolo = _load_yolo_tensorrt() if YOLO_TENSORRT else None
+                model = yolo or YOLO(YOLO_WEIGHTS)
+    return model
+
+
+def detect(image, allowed_classes=['*'], save=True, verbose=True, max_side=None):
     """
     Detect objects in an image and filter by allowed classes.
     
@@ -21,12 +91,23 @@ def detect(image, allowed_classes=['*'], save=True, verbose=True):
         allowed_classes: List of class names to filter (default: ['Rubik'])
         save: Whether to save the annotated image (default: True)
         verbose: Whether to print detection info (default: True)
+        max_side: If set, numpy frames larger than this are downscaled before
+            inference; bboxes are scaled back to the original frame
     
     Returns:
         dict: Contains 'detections' (list of filtered detections), 
-              'annotated_image' (numpy array), and 'output_path' (str or None)
+              'annotated_image' (numpy array, at the downscaled size if max_side applied),
+              and 'output_path' (str or None)
     """
-    results = model.predict(image, save=save, conf=0.5, verbose=verbose) 
+    scale = 1.0
+    if max_side and isinstance(image, np.ndarray):
+        h, w = image.shape[:2]
+        if max(h, w) > max_side:
+            scale = max(h, w) / max_side
+            image = cv2.resize(image, (round(w / scale), round(h / scale)), interpolation=cv2.INTER_LINEAR)
+    
+    yolo = get_yolo_model()
+    results = yolo.predict(image, save=save, conf=0.5, verbose=verbose) 
 
     # Optional: Accessing the results programmatically
     filtered_detections = []
@@ -41,7 +122,7 @@ def detect(image, allowed_classes=['*'], save=True, verbose=True):
             print(f"Detected {len(boxes)} objects.")
         
         # Get class names from the model
-        class_names = model.names
+        class_names = yolo.names
         
         # Filter boxes by allowed classes
         for box in boxes:
@@ -51,7 +132,7 @@ def detect(image, allowed_classes=['*'], save=True, verbose=True):
             cls_id = int(box.cls.item())
             conf = box.conf.item()
             class_name = class_names[cls_id]
-            coords = box.xyxy[0].cpu().numpy()
+            coords = box.xyxy[0].cpu().numpy() * scale
             
             # Only include detections that match allowed classes
             if allow_all or class_name in allowed_classes:
@@ -100,6 +181,68 @@ def get_fresh_transform():
     ])
 
 
+class ArrayFreshTransform:
+    """
+    OpenCV/NumPy equivalent of get_fresh_transform() that works directly on
+    BGR numpy crops, skipping the PIL round-trip on the per-detection path.
+    """
+    def __init__(self, size=224, mean=(0.485, 0.456, 0.406), std=(0.229, 0.224, 0.225)):
+        """
+        Args:
+            size: Output width/height in pixels
+            mean: Per-channel normalization mean (RGB)
+            std: Per-channel normalization std (RGB)
+        """
+        self.size = size
+        # Fold ToTensor's /255 into the normalization constants
+        self.scale = (1.0 / (255.0 * np.asarray(std, dtype=np.float32))).reshape(1, 1, 3)
+        self.offset = (np.asarray(mean, dtype=np.float32) / np.asarray(std, dtype=np.float32)).reshape(1, 1, 3)
+    
+    def __call__(self, image_array):
+        """
+        Args:
+            image_array: numpy array in BGR format (from cv2)
+        
+        Returns:
+            torch.Tensor: Normalized CHW float tensor
+        """
+        normalized = self._normalized_hwc(image_array)
+        return torch.from_numpy(np.ascontiguousarray(normalized.transpose(2, 0, 1)))
+    
+    def batch(self, image_arrays):
+        """
+        Preprocess several BGR crops straight into one preallocated batch
+        (no per-crop tensors for torch.stack to copy again).
+        
+        Returns:
+            torch.Tensor: Normalized NCHW float tensor
+        """
+        out = np.empty((len(image_arrays), 3, self.size, self.size), dtype=np.float32)
+        for i, image_array in enumerate(image_arrays):
+            out[i] = self._normalized_hwc(image_array).transpose(2, 0, 1)
+        return torch.from_numpy(out)
+    
+    def _normalized_hwc(self, image_array):
+        """Resize, convert to RGB and normalize one crop (HWC float32)"""
+        height, width = image_array.shape[:2]
+        # INTER_AREA is the better filter when shrinking, INTER_LINEAR when enlarging
+        interpolation = cv2.INTER_AREA if height > self.size or width > self.size else cv2.INTER_LINEAR
+        resized = cv2.resize(image_array, (self.size, self.size), interpolation=interpolation)
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        return rgb.astype(np.float32) * self.scale - self.offset
+
+
+def get_fresh_array_transform():
+    """
+    Get the numpy-based preprocessing transform for fresh detection model.
+    Produces the same 224x224 ImageNet-normalized input as get_fresh_transform().
+    
+    Returns:
+        ArrayFreshTransform: Preprocessing callable for BGR numpy arrays
+    """
+    return ArrayFreshTransform(size=224)
+
+
 def load_fresh_detection_model(model_path="./model/fresh_detector.pth"):
     """
     Load and setup the fresh detection model.
@@ -119,9 +262,114 @@ def load_fresh_detection_model(model_path="./model/fresh_detector.pth"):
     # Load model with proper device mapping (handles CUDA->CPU conversion)
     fresh_model = load_model(model_path, device=device)
     fresh_model.eval()
-    transform = get_fresh_transform()
+    transform = get_fresh_array_transform()
+    
+    if device.type == "cuda":
+        # Input shape is fixed, so let cuDNN pick the fastest kernels once
+        torch.backends.cudnn.benchmark = True
+        if TENSORRT_AVAILABLE and FRESH_USE_TENSORRT:
+            fresh_model = compile_fresh_model_tensorrt(fresh_model, transform.size)
+        else:
+            if FRESH_FP16:
+                # Half the weight/activation bytes and Tensor Core kernels; inputs are
+                # cast on the way in and scores come back as FP32
+                fresh_model = _HalfPrecisionModel(fresh_model.half())
+                print("✅ Fresh detection model running in FP16")
+            if FRESH_TORCH_COMPILE:
+                try:
+                    fresh_model = torch.compile(fresh_model, mode='reduce-overhead')
+                    print("✅ Fresh detection model compiled with torch.compile")
+                except Exception as e:
+                    print(f"⚠️ torch.compile failed, using eager model: {e}")
+    elif FRESH_QUANTIZE_INT8:
+        fresh_model = quantize_fresh_model_int8(fresh_model)
+    
+    warm_up_fresh_model(fresh_model, device, transform.size)
     return fresh_model, device, transform
 
+
+class _HalfPrecisionModel(torch.nn.Module):
+    """Feeds FP16 inputs to an FP16 (eager or TensorRT) module and returns FP32 outputs"""
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+    
+    def forward(self, x):
+        return self.module(x.half()).float()
+
+
+def quantize_fresh_model_int8(fresh_model):
+    """
+    Dynamically quantize the fresh model's Linear layers to INT8 for CPU inference.
+    Uses the oneDNN/x86 backend when available so VNNI int8 kernels are used.
+    Falls back to the FP32 model if quantization is not supported.
+    
+    Args:
+        fresh_model: The fresh detection model (on CPU, eval mode)
+    
+    Returns:
+        torch.nn.Module: Quantized model, or the original model
+    """
+    try:
+        supported_engines = torch.backends.quantized.supported_engines
+        for engine in ('onednn', 'x86', 'fbgemm'):
+            if engine in supported_engines:
+                torch.backends.quantized.engine = engine
+                break
+        
+        quantized = torch.ao.quantization.quantize_dynamic(
+            fresh_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        print(f"✅ Fresh detection model quantized to INT8 ({torch.backends.quantized.engine})")
+        return quantized
+    except Exception as e:
+        print(f"⚠️ INT8 quantization failed, using FP32 model: {e}")
+        return fresh_model
+
+
+def compile_fresh_model_tensorrt(fresh_model, size=224):
+    """
+    Compile the fresh model to a TensorRT FP16 engine for the fixed input size.
+    Falls back to the eager PyTorch model if compilation fails.
+    
+    Args:
+        fresh_model: The fresh detection model (on CUDA, eval mode)
+        size: Input width/height in pixels
+    
+    Returns:
+        torch.nn.Module: TensorRT-backed model, or the original model
+    """
+    try:
+        trt_model = torch_tensorrt.compile(
+            fresh_model.half(),
+            inputs=[torch_tensorrt.Input(
+                min_shape=(1, 3, size, size),
+                opt_shape=(4, 3, size, size),
+                max_shape=(FRESH_MAX_BATCH, 3, size, size),
+                dtype=torch.half
+            )],
+            enabled_precisions={torch.half}
+        )
+        print("✅ Fresh detection model compiled with TensorRT (FP16)")
+        return _HalfPrecisionModel(trt_model)
+    except Exception as e:
+        print(f"⚠️ TensorRT compilation failed, using PyTorch model: {e}")
+        return fresh_model.float()
+
+
+def warm_up_fresh_model(model, device, size=224):
+    """
+    Run one dummy forward pass so one-time setup (kernel selection, allocator
+    growth, lazy CUDA init) happens at startup instead of on the first frame.
+    
+    Args:
+        model: The fresh detection model
+        device: torch device
+        size: Input width/height in pixels
+    """
+    with torch.no_grad():
+        model(torch.zeros(1, 3, size, size, device=device))
+
 def inference_fresh_from_array(model, image_array, device, transform):
     """
     Run fresh detection inference on a numpy array (BGR format from OpenCV).
@@ -130,17 +378,21 @@ def inference_fresh_from_array(model, image_array, device, transform):
         model: The fresh detection model
         image_array: numpy array in BGR format (from cv2)
         device: torch device
-        transform: preprocessing transform
+        transform: preprocessing transform (ArrayFreshTransform or a PIL-based torchvision transform)
     
     Returns:
         float: Probability of being fresh (0-1, where 1 = fresh, 0 = rotten)
     """
-    # Convert BGR to RGB
-    rgb_image = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
-    # Convert numpy array to PIL Image
-    pil_image = Image.fromarray(rgb_image)
-    # Apply transform
-    image_tensor = transform(pil_image)
+    if isinstance(transform, ArrayFreshTransform):
+        # Resize/normalize directly on the numpy crop
+        image_tensor = transform(image_array)
+    else:
+        # Convert BGR to RGB
+        rgb_image = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
+        # Convert numpy array to PIL Image
+        pil_image = Image.fromarray(rgb_image)
+        # Apply transform
+        image_tensor = transform(pil_image)
     image_tensor = image_tensor.unsqueeze(0).to(device)
     
     with torch.no_grad():
@@ -191,6 +443,30 @@ def crop_bounding_box(frame, bbox):
     return None
 
 
+def crop_bounding_boxes(frame, bboxes):
+    """
+    Crop several bounding boxes from a frame, clamping all coordinates in one NumPy pass.
+    
+    Args:
+        frame: Input frame (numpy array)
+        bboxes: List of [x1, y1, x2, y2] coordinates
+    
+    Returns:
+        list: Cropped image (a view into frame) per bbox, or None where the bbox is empty
+    """
+    if not bboxes:
+        return []
+    height, width = frame.shape[:2]
+    # astype truncates toward zero like int(); clamping every side to the frame keeps
+    # the same empty/non-empty outcome as normalize_bbox_coordinates
+    boxes = np.asarray(bboxes, dtype=np.float64).astype(np.int32)
+    np.clip(boxes, 0, (width, height, width, height), out=boxes)
+    return [
+        frame[y1:y2, x1:x2] if x2 > x1 and y2 > y1 else None
+        for x1, y1, x2, y2 in boxes.tolist()
+    ]
+
+
 def get_freshness_score(cropped_image, fresh_model, device, transform):
     """
     Get freshness score for a cropped image.
@@ -212,6 +488,50 @@ def get_freshness_score(cropped_image, fresh_model, device, transform):
         return None
 
 
+def _fresh_input_tensor(image_array, transform):
+    """Preprocess one BGR crop into a CHW tensor with either transform type"""
+    if isinstance(transform, ArrayFreshTransform):
+        return transform(image_array)
+    rgb_image = cv2.cvtColor(image_array, cv2.COLOR_BGR2RGB)
+    return transform(Image.fromarray(rgb_image))
+
+
+def get_freshness_scores(cropped_images, fresh_model, device, transform):
+    """
+    Get freshness scores for several crops with one forward pass per FRESH_MAX_BATCH crops.
+    
+    Args:
+        cropped_images: List of cropped images as numpy arrays
+        fresh_model: The fresh detection model
+        device: torch device
+        transform: preprocessing transform
+    
+    Returns:
+        list: Freshness score (0-100) per crop, or None for every crop if inference failed
+    """
+    if not cropped_images:
+        return []
+    
+    try:
+        scores = []
+        with torch.inference_mode():
+            for start in range(0, len(cropped_images), FRESH_MAX_BATCH):
+                chunk = cropped_images[start:start + FRESH_MAX_BATCH]
+                if isinstance(transform, ArrayFreshTransform):
+                    batch = transform.batch(chunk)
+                else:
+                    batch = torch.stack([_fresh_input_tensor(crop, transform) for crop in chunk])
+                if device.type == 'cuda':
+                    # Page-locked source lets the host->device copy run asynchronously
+                    batch = batch.pin_memory().to(device, non_blocking=True)
+                output = fresh_model(batch)
+                scores.extend((torch.sigmoid(output).view(-1) * 100).tolist())
+        return scores
+    except Exception as e:
+        print(f"Error in fresh detection: {e}")
+        return [None] * len(cropped_images)
+
+
 def create_detection_label(class_name, confidence, freshness_score=None):
     """
     Create a label string for a detection.
@@ -0,0 +1,168 @@
+"""
+Inference Worker Process
+Runs YOLO detection and freshness scoring in a separate process so the GIL-bound
+parts of inference don't compete with frame capture, JPEG encoding and websocket sends.
+Frames are passed through shared memory; detections come back over a socket pair.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+
+# Largest frame (bytes) the shared slot holds; bigger frames fall back to in-process detection
+INFERENCE_SHM_BYTES = 1920 * 1080 * 3
+# Seconds to wait for the worker to load its models before giving up
+INFERENCE_STARTUP_TIMEOUT = 300
+# Seconds to wait for one frame's detections before treating the worker as hung
+INFERENCE_REQUEST_TIMEOUT = 10
+
+
+def _inference_main(conn, shm_name, fresh_model_path, max_side):
+    """Worker process entry point: load models once, then serve detection requests"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    # Imported here so the models are only loaded once the worker process is running
+    from detect_fruits import detect, load_fresh_detection_model, crop_bounding_boxes, get_freshness_scores
+
+    fresh_model = fresh_device = fresh_transform = None
+    try:
+        fresh_model, fresh_device, fresh_transform = load_fresh_detection_model(fresh_model_path)
+    except Exception as e:
+        print(f"⚠️ Inference worker: could not load fresh detection model: {e}")
+    conn.send(('ready', fresh_model is not None))
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+
+        shape, allowed_classes, min_confidence = request
+        try:
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            result = detect(frame, allowed_classes=allowed_classes, save=False, verbose=False, max_side=max_side)
+            detections = result['detections']
+
+            # Score confident detections here too, cropping from the shared full-size frame
+            confident = [d for d in detections if d['confidence'] >= min_confidence]
+            for detection in detections:
+                detection['freshness_score'] = None
+            if fresh_model is not None:
+                crops = zip(confident, crop_bounding_boxes(frame, [d['bbox'] for d in confident]))
+                crops = [(d, cropped) for d, cropped in crops if cropped is not None]
+                scores = get_freshness_scores([cropped for _, cropped in crops], fresh_model, fresh_device, fresh_transform)
+                for (detection, _), score in zip(crops, scores):
+                    detection['freshness_score'] = score
+            del frame
+            conn.send(('ok', detections))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    shm.close()
+
+
+class InferenceWorker:
+    """
+    Handle to the inference process.
+    detect() is blocking for the caller, but the GIL is free while it waits, so
+    capture, encoding and websocket threads keep running alongside inference.
+    """
+
+    def __init__(self, fresh_model_path, max_side=None):
+        """
+        Args:
+            fresh_model_path: Path to the fresh detection model file
+            max_side: Longest frame side YOLO sees (see detect_fruits.detect)
+        """
+        self._shm = shared_memory.SharedMemory(create=True, size=INFERENCE_SHM_BYTES)
+        self._lock = threading.Lock()
+
+        # A fresh interpreter rather than multiprocessing fork/spawn: forking would
+        # inherit CUDA/OpenCV state, and spawn re-runs main.py's module-level setup
+        parent_sock, child_sock = socket.socketpair()
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(child_sock.fileno()),
+             self._shm.name, fresh_model_path, str(max_side or 0)],
+            pass_fds=(child_sock.fileno(),)
+        )
+        child_sock.close()
+        self._conn = Connection(parent_sock.detach())
+
+        # Whether the worker has a fresh model, so callers can report it without loading one
+        self.fresh_model_loaded = False
+        try:
+            ready = self._conn.poll(INFERENCE_STARTUP_TIMEOUT)
+            if ready:
+                status, self.fresh_model_loaded = self._conn.recv()
+                ready = status == 'ready'
+        except EOFError:
+            ready = False
+        if not ready:
+            self.close()
+            raise RuntimeError('Inference worker did not start')
+
+    def is_alive(self):
+        """True while the worker process is running"""
+        return self._process.poll() is None
+    
+    def detect(self, frame, allowed_classes, min_confidence):
+        """
+        Run detection and freshness scoring on frame in the worker process.
+
+        Returns:
+            list or None: Detections with 'freshness_score' set, or None if the
+            frame doesn't fit the shared slot or the worker failed or timed out
+        """
+        if frame.dtype != np.uint8 or frame.nbytes > INFERENCE_SHM_BYTES:
+            return None
+
+        with self._lock:
+            if self._process.poll() is not None:
+                return None
+            np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf)[...] = frame
+            try:
+                self._conn.send((frame.shape, allowed_classes, min_confidence))
+                if self._conn.poll(INFERENCE_REQUEST_TIMEOUT):
+                    status, payload = self._conn.recv()
+                else:
+                    # A late reply would be read as the answer to the next request,
+                    # so stop the worker; callers detect in-process from now on
+                    self._process.kill()
+                    status, payload = 'error', f'no reply within {INFERENCE_REQUEST_TIMEOUT}s, worker stopped'
+            except (EOFError, OSError) as e:
+                status, payload = 'error', f'worker connection lost: {e}'
+
+        if status != 'ok':
+            print(f"❌ Inference worker error: {payload}")
+            return None
+        return payload
+
+    def close(self):
+        """Stop the worker process and free the shared memory"""
+        try:
+            if self._process.poll() is None:
+                self._conn.send(None)
+                self._process.wait(timeout=5)
+        except Exception:
+            self._process.kill()
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == '__main__':
+    # Launched by InferenceWorker: <socket fd> <shm name> <fresh model path> <max side>
+    _inference_main(
+        Connection(int(sys.argv[1])),
+        sys.argv[2],
+        sys.argv[3],
+        int(sys.argv[4]) or None
+    )
@@ -2,22 +2,37 @@ from flask import Flask, jsonify, request, send_from_directory, Response, stream
 from flask_cors import CORS
 from flask_sock import Sock
 from dotenv import load_dotenv
+from werkzeug.security import safe_join
+import atexit
 import json
+import logging
+import mimetypes
 import os
 import cv2
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
+import queue
 import random
+import struct
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import func, select
+from sqlalchemy.orm import contains_eager, joinedload, load_only, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 # Load environment variables
 load_dotenv()
 
+from utils.log import get_logger, warn_rate_limited
+
+logger = get_logger('main')
+
 # Import our modules
-from models import db, Store, FruitInventory, FreshnessStatus, Customer, PurchaseHistory, Recommendation, WasteLog
-from database import init_db, seed_sample_data
+from models import db, Store, FruitInventory, FreshnessStatus, Customer, PurchaseHistory, Recommendation, WasteLog, CRITICAL_STATUSES
+from database import init_db, seed_sample_data, commit_session, write_transaction
 
 # Import Knot client with fallback support
 try:
@@ -34,22 +49,37 @@ except ImportError:
 from detect_fruits import (
     detect, 
     load_fresh_detection_model, 
-    crop_bounding_box, 
-    get_freshness_score,
-    get_best_camera_index
+    crop_bounding_boxes,
+    get_freshness_scores,
+    get_best_camera_index,
+    DETECT_MAX_SIDE
 )
-from utils.image_storage import save_detection_image, get_category_images, get_all_categories, DETECTION_IMAGES_DIR, replace_category_images, delete_category_images, save_thumbnail, mark_image_as_processed, save_processed_image, keep_latest_images   
+from utils.image_storage import save_detection_image, get_category_images, get_all_categories, DETECTION_IMAGES_DIR, replace_category_images, delete_category_images, save_thumbnail, mark_image_as_processed, save_processed_image, keep_latest_images, write_metadata   
 from blemish_detection.blemish import detect_blemishes
+from utils.blemish_cache import image_content_hash, get_cached_blemishes, cache_blemishes
+from utils.response_cache import cached, clear_prefix, TTLCache
 import threading
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+# Each websocket holds a server thread while it waits in receive(); pinging idle sockets
+# lets the server notice clients that vanished without a close frame and free the thread
+WS_PING_INTERVAL = int(os.getenv('WS_PING_INTERVAL', '25'))
+app.config['SOCK_SERVER_OPTIONS'] = {'ping_interval': WS_PING_INTERVAL or None}
 sock = Sock(app)  # Initialize WebSocket support
 PORT = os.getenv('PORT', 3000)
 # Camera mode: 'local' (use local camera) or 'proxy' (receive frames from proxy)
 CAMERA_MODE = os.getenv('CAMERA_MODE', 'local').lower()
 
+# Detection image delivery: 'x-sendfile' (Apache mod_xsendfile) or 'x-accel' (nginx)
+# hand the file bytes to the front-end server; anything else serves them from Flask
+IMAGE_SENDFILE = os.getenv('IMAGE_SENDFILE', '').lower()
+# Internal nginx location aliased to detection_images/ (used with IMAGE_SENDFILE=x-accel)
+X_ACCEL_DETECTION_PREFIX = os.getenv('X_ACCEL_DETECTION_PREFIX', '/_detection_images/')
+if IMAGE_SENDFILE == 'x-sendfile':
+    app.use_x_sendfile = True
+
 # Database configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///edgecart.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -85,13 +115,54 @@ if os.getenv('POPULATE', 'false').lower() == 'true':
 
 # Initialize Knot API client
 knot_client = get_knot_client()
+# The mock client is chosen once at startup, so resolve the mode once too
+KNOT_IS_MOCK = hasattr(knot_client, 'mock_data')
+app.knot_client = knot_client
+app.config['KNOT_IS_MOCK'] = KNOT_IS_MOCK
+
+# Knot responses are idempotent for minutes; cache them to skip repeat HTTPS calls.
+# Pass ?fresh=1 to bypass.
+knot_response_cache = TTLCache(maxsize=1024, ttl=60, stale_ttl=600)
 
-# WebSocket connections are now managed in utils/helpers.py
-# Import them for backward compatibility
-from utils.helpers import admin_connections, customer_connections
+# Short-lived id -> {id, name, knot_customer_id} summaries for the per-customer
+# endpoints, so repeat hits skip the customer SELECT. Drop entries when a customer changes.
+customer_summary_cache = TTLCache(maxsize=2048, ttl=5)
+
+
+def _get_customer_summary(customer_id):
+    """
+    Look up the customer columns the per-customer endpoints need.
+    
+    Returns:
+        dict or None: {'id', 'name', 'knot_customer_id'}, or None if the customer doesn't exist
+    """
+    summary = customer_summary_cache.get(customer_id)
+    if summary is None:
+        row = db.session.query(Customer.id, Customer.name, Customer.knot_customer_id).filter(
+            Customer.id == customer_id
+        ).first()
+        if row is None:
+            return None
+        summary = {'id': row.id, 'name': row.name, 'knot_customer_id': row.knot_customer_id}
+        customer_summary_cache.set(customer_id, summary)
+    return summary
+
+# Admin/customer WebSocket connections are managed in utils/helpers.py
+from utils.helpers import ConnectionSet
 
 # Store frontend video stream connections for broadcasting
-frontend_video_connections = set()
+frontend_video_connections = ConnectionSet()
+
+# Video clients that connected with ?format=msgpack (a subset of frontend_video_connections)
+# get MessagePack messages instead: control envelopes and frames as one msgpack map with
+# the raw JPEG under 'jpg'. Everyone else keeps JSON control text and binary-framed JPEGs.
+try:
+    import msgpack
+    _MSGPACK_DECODE_ERRORS = (ValueError, msgpack.UnpackException)
+except ImportError:
+    msgpack = None
+    _MSGPACK_DECODE_ERRORS = (ValueError,)
+msgpack_video_connections = ConnectionSet()
 
 # Shared proxy state (for proxy mode - shared across all proxy connections)
 proxy_state_global = None
@@ -103,34 +174,89 @@ category_images_memory_cache = {}
 # Store memory cache reference in app config for access from other modules
 app.config['category_images_memory_cache'] = category_images_memory_cache
 
-# Load fresh detection model globally (once at startup)
-fresh_model = None
-fresh_device = None
-fresh_transform = None
-try:
-    # Try loading fresh_detector.pth first, fallback to ripe_detector.pth for backward compatibility
-    model_path = "./model/fresh_detector.pth"
-    if not os.path.exists(model_path) and os.path.exists("./model/ripe_detector.pth"):
-        print("⚠️ fresh_detector.pth not found, trying ripe_detector.pth (old model)")
-        model_path = "./model/ripe_detector.pth"
-    
-    fresh_model, fresh_device, fresh_transform = load_fresh_detection_model(model_path)
-    print("✅ Fresh detection model loaded successfully")
-except Exception as e:
-    print(f"⚠️ Warning: Could not load fresh detection model: {e}")
-    print("   Video stream will work but without fresh detection")
-    import traceback
-    traceback.print_exc()
+# Try fresh_detector.pth first, fallback to ripe_detector.pth for backward compatibility
+model_path = "./model/fresh_detector.pth"
+if not os.path.exists(model_path) and os.path.exists("./model/ripe_detector.pth"):
+    print("⚠️ fresh_detector.pth not found, trying ripe_detector.pth (old model)")
+    model_path = "./model/ripe_detector.pth"
+
+# The fresh detection model is loaded on first use by the camera code, so workers that
+# only serve the REST API never pay for the PyTorch load. FRESH_MODEL_PRELOAD=true loads it now.
+_fresh_model_lock = threading.Lock()
+_fresh_model_bundle = None  # (model, device, transform) once a load has been attempted
+
+
+def get_fresh_model():
+    """
+    Load the fresh detection model once and return it.
+    
+    Returns:
+        (model, device, transform) - all None if the model couldn't be loaded
+    """
+    global _fresh_model_bundle
+    if _fresh_model_bundle is not None:
+        return _fresh_model_bundle
+    
+    with _fresh_model_lock:
+        if _fresh_model_bundle is None:
+            try:
+                _fresh_model_bundle = load_fresh_detection_model(model_path)
+                print("✅ Fresh detection model loaded successfully")
+            except Exception as e:
+                print(f"⚠️ Warning: Could not load fresh detection model: {e}")
+                print("   Video stream will work but without fresh detection")
+                import traceback
+                traceback.print_exc()
+                _fresh_model_bundle = (None, None, None)
+    return _fresh_model_bundle
+
+
+# Optionally run YOLO + freshness inference in a separate process (INFERENCE_PROCESS=true)
+# so it doesn't hold the GIL against frame capture, encoding and websocket sends
+inference_worker = None
+if os.getenv('INFERENCE_PROCESS', 'false').lower() == 'true':
+    try:
+        from inference_worker import InferenceWorker
+        inference_worker = InferenceWorker(model_path, max_side=DETECT_MAX_SIDE)
+        print("✅ Inference worker process started")
+    except Exception as e:
+        print(f"⚠️ Inference worker unavailable, detecting in-process: {e}")
+
+
+def _inference_worker_active():
+    """True while the inference process is running (it holds its own copy of the models)"""
+    return inference_worker is not None and inference_worker.is_alive()
+
+
+def _fresh_model_loaded():
+    """Whether a fresh detection model is loaded, without triggering a load"""
+    if _inference_worker_active():
+        return inference_worker.fresh_model_loaded
+    return _fresh_model_bundle is not None and _fresh_model_bundle[0] is not None
+
+
+# The worker already loads the model; preloading here would keep a second copy
+if os.getenv('FRESH_MODEL_PRELOAD', 'false').lower() == 'true' and not _inference_worker_active():
+    get_fresh_model()
 
 # ============ Import Utility Functions ============
 from utils.helpers import (
-    admin_connections,
-    customer_connections,
+    json_dumps,
+    json_dumps_bytes,
+    sse_event,
+    stream_json_list,
+    get_admin_stats,
+    add_admin_connection,
+    remove_admin_connection,
+    add_customer_connection,
+    remove_customer_connection,
     broadcast_to_admins,
+    broadcast_to_admins_coalesced,
     notify_customer,
     notify_quantity_change,
-    update_freshness_for_item,
+    queue_freshness_update,
     generate_recommendations_for_item,
+    generate_recommendations_bulk,
     set_app_instance
 )
 
@@ -154,6 +280,63 @@ except ImportError as e:
     print(f"⚠️  Analytics API not available: {e}")
 
 
+# ============ Camera DB Writer ============
+# Capture/inference threads hand their DB work to one writer thread so the
+# frame loop never waits on commits. The writer holds one app context (and so
+# one session) for its lifetime; jobs that arrive within the batch window run
+# back to back on it.
+CAMERA_DB_BATCH_WINDOW = 0.2  # seconds
+# Bounded so a stalled database can't grow the backlog without limit; when it is
+# full the frame loops drop the job and retry the change on a later detection pass
+CAMERA_DB_QUEUE_SIZE = 256
+_camera_db_queue = queue.Queue(maxsize=CAMERA_DB_QUEUE_SIZE)
+
+
+def _camera_db_worker():
+    """Run queued camera DB jobs, batching those that arrive close together"""
+    # Pushed once so the scoped session isn't torn down and rebuilt per batch
+    app.app_context().push()
+    
+    while True:
+        jobs = [_camera_db_queue.get()]
+        deadline = time.time() + CAMERA_DB_BATCH_WINDOW
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(_camera_db_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        for fn, args in jobs:
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"❌ Error in camera DB writer: {e}")
+                import traceback
+                traceback.print_exc()
+                # Reset the long-lived session so the failure doesn't poison later jobs
+                db.session.rollback()
+
+
+def submit_camera_db_job(fn, *args):
+    """
+    Queue fn(*args) to run on the camera DB writer thread without blocking the caller.
+    
+    Returns:
+        bool: False if the writer is backed up and the job was dropped
+    """
+    try:
+        _camera_db_queue.put_nowait((fn, args))
+        return True
+    except queue.Full:
+        return False
+
+
+threading.Thread(target=_camera_db_worker, daemon=True, name='camera-db-writer').start()
+
+
 # ============ Camera-Specific Helper Functions ============
 
 def update_freshness_from_camera(inventory_id, freshness_score, confidence):
@@ -162,42 +345,167 @@ def update_freshness_from_camera(inventory_id, freshness_score, confidence):
     Called automatically when camera detects freshness.
     
     Note: This function is specific to camera detection and converts freshness_score (0-100)
-    to freshness_score (0-1.0) before calling update_freshness_for_item.
+    to freshness_score (0-1.0) before queueing it for the micro-batch freshness writer.
     """
-    try:
-        with app.app_context():
-            # Convert freshness_score from 0-100 scale to 0-1.0 scale
-            freshness_score = freshness_score / 100.0 if freshness_score is not None else None
-            
-            if freshness_score is not None:
-                # Use the helper function from utils.helpers
-                update_freshness_for_item(inventory_id, freshness_score)
-                
-                # Also update confidence and predicted expiry
-                freshness = FreshnessStatus.query.filter_by(inventory_id=inventory_id).first()
-                if freshness:
-                    freshness.confidence_level = confidence
-                    # Predict expiry based on freshness (simple heuristic)
-                    # Lower freshness = closer to expiry
-                    days_until_expiry = int(freshness_score * 10)  # 0-10 days
-                    freshness.predicted_expiry_date = datetime.utcnow() + timedelta(days=days_until_expiry)
-                    freshness.last_checked = datetime.utcnow()
-                    db.session.commit()
-                    
-                    # Broadcast update with source indicator
-                    inventory = db.session.get(FruitInventory, inventory_id)
-                    if inventory:
-                        broadcast_to_admins('freshness_updated', {
-                            'inventory_id': inventory_id,
-                            'freshness': freshness.to_dict(),
-                            'item': inventory.to_dict(),
-                            'source': 'camera'
-                        })
+    if freshness_score is None:
+        return
     
-    except Exception as e:
-        print(f"❌ Error updating freshness from camera: {e}")
-        import traceback
-        traceback.print_exc()
+    # Convert freshness_score from 0-100 scale to 0-1.0 scale
+    freshness_score = freshness_score / 100.0
+    
+    # Predict expiry based on freshness (simple heuristic)
+    # Lower freshness = closer to expiry
+    days_until_expiry = int(freshness_score * 10)  # 0-10 days
+    predicted_expiry = datetime.utcnow() + timedelta(days=days_until_expiry)
+    
+    queue_freshness_update(inventory_id, freshness_score, confidence, predicted_expiry)
+
+
+# ============ Shared Camera ============
+# One VideoCapture is shared by every local-mode stream. Opening a device and letting
+# its auto-exposure settle is slow, so the camera stays open for a while after the
+# last viewer stops instead of being reopened on every 'start'.
+# A grabber thread keeps reading frames off the device into a latest-frame slot, so
+# readers get only the newest frame (even on backends that ignore BUFFERSIZE) and
+# never wait on the device themselves.
+
+CAMERA_IDLE_RELEASE_SECONDS = 30
+# Probing for the best index opens (and reads from) up to 11 devices, so the result is
+# kept for later reopens; CAMERA_INDEX skips the probe entirely
+_camera_index = int(os.environ['CAMERA_INDEX']) if os.getenv('CAMERA_INDEX') else None
+
+# Longest a reader waits for the grabber to deliver a new frame before reporting a failed read
+CAMERA_READ_TIMEOUT = 2.0
+
+_camera_lock = threading.Lock()
+# Held by the grabber around each device read, and by release so it never closes mid-read
+_camera_device_lock = threading.Lock()
+_camera_refcount = 0
+_shared_camera = None
+_camera_release_timer = None
+# Latest-frame slot: (sequence number, frame), replaced by the grabber after every read
+_camera_frame_cond = threading.Condition()
+_camera_frame = (0, None)
+_camera_reader_state = threading.local()  # per-thread sequence number of the last frame handed out
+
+
+def _camera_grab_loop(camera):
+    """Read frames from camera into the latest-frame slot until it stops being the shared camera"""
+    global _camera_frame
+    while _shared_camera is camera:
+        with _camera_device_lock:
+            if _shared_camera is not camera or not camera.isOpened():
+                break
+            ok, frame = camera.read()
+        if not ok:
+            time.sleep(0.01)  # don't spin on a device that has stopped delivering
+            continue
+        with _camera_frame_cond:
+            _camera_frame = (_camera_frame[0] + 1, frame)
+            _camera_frame_cond.notify_all()
+
+
+def acquire_shared_camera():
+    """
+    Return the shared camera, opening it on first use.
+    Every successful call must be paired with release_shared_camera().
+
+    Returns:
+        cv2.VideoCapture, or None if the camera could not be opened
+    """
+    global _camera_refcount, _shared_camera, _camera_release_timer, _camera_index, _camera_frame
+    with _camera_lock:
+        if _camera_release_timer is not None:
+            _camera_release_timer.cancel()
+            _camera_release_timer = None
+
+        if _shared_camera is None or not _shared_camera.isOpened():
+            camera = None
+            if _camera_index is not None:
+                camera = cv2.VideoCapture(_camera_index)
+            if (camera is None or not camera.isOpened()) and not os.getenv('CAMERA_INDEX'):
+                # First open, or the remembered device went away: probe again
+                if camera is not None:
+                    camera.release()
+                _camera_index = get_best_camera_index()
+                camera = cv2.VideoCapture(_camera_index)
+            if not camera.isOpened():
+                camera.release()
+                return None
+            # Keep only the newest frame so reads never return stale buffered images
+            camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            _shared_camera = camera
+            with _camera_frame_cond:
+                # Drop the previous device's last frame; keep the sequence increasing
+                _camera_frame = (_camera_frame[0], None)
+            threading.Thread(target=_camera_grab_loop, args=(camera,), daemon=True, name='camera-grabber').start()
+            print("📷 Shared camera opened")
+
+        _camera_refcount += 1
+        return _shared_camera
+
+
+def release_shared_camera():
+    """Drop one reference to the shared camera; it is closed after CAMERA_IDLE_RELEASE_SECONDS idle"""
+    global _camera_refcount, _camera_release_timer
+    with _camera_lock:
+        _camera_refcount = max(0, _camera_refcount - 1)
+        if _camera_refcount == 0 and _shared_camera is not None and _camera_release_timer is None:
+            _camera_release_timer = threading.Timer(CAMERA_IDLE_RELEASE_SECONDS, _close_idle_camera)
+            _camera_release_timer.daemon = True
+            _camera_release_timer.start()
+
+
+def _close_idle_camera():
+    """Release the shared camera if nobody re-acquired it during the idle window"""
+    global _shared_camera, _camera_release_timer
+    with _camera_lock:
+        _camera_release_timer = None
+        if _camera_refcount > 0 or _shared_camera is None:
+            return
+        # Under the device lock so the grabber isn't inside read() during release
+        with _camera_device_lock:
+            try:
+                _shared_camera.release()
+            except Exception:
+                pass
+            _shared_camera = None
+        print("📷 Shared camera released after idle timeout")
+
+
+def _release_camera_at_exit():
+    """Release the shared camera on interpreter shutdown so the device is left in a clean state"""
+    with _camera_device_lock:
+        if _shared_camera is not None:
+            _shared_camera.release()
+
+
+atexit.register(_release_camera_at_exit)
+
+# Stop the inference process and free its shared memory segment on shutdown
+if inference_worker is not None:
+    atexit.register(inference_worker.close)
+
+
+def read_shared_camera(camera):
+    """
+    Return the newest frame from the grabber, waiting until one arrives that this
+    thread hasn't seen yet. Streams share the frame array, so callers must not draw on it.
+    
+    Returns:
+        (ret, frame) like VideoCapture.read(); ret is False if no new frame
+        arrived within CAMERA_READ_TIMEOUT
+    """
+    last_seq = getattr(_camera_reader_state, 'seq', 0)
+    with _camera_frame_cond:
+        if not _camera_frame_cond.wait_for(
+            lambda: _camera_frame[0] > last_seq and _camera_frame[1] is not None,
+            timeout=CAMERA_READ_TIMEOUT
+        ):
+            return False, None
+        seq, frame = _camera_frame
+    _camera_reader_state.seq = seq
+    return True, frame
 
 
 # ============ Freshness Monitoring API ============
@@ -219,17 +527,25 @@ def update_freshness():
         data = request.get_json()
         inventory_id = data['inventory_id']
         
+        # Load the item and its freshness row in one query
+        inventory = db.session.get(
+            FruitInventory, inventory_id, options=[joinedload(FruitInventory.freshness)]
+        )
+        
         # Get or create freshness status
-        freshness = FreshnessStatus.query.filter_by(inventory_id=inventory_id).first()
+        freshness = inventory.freshness if inventory else FreshnessStatus.query.filter_by(inventory_id=inventory_id).first()
         
         if not freshness:
             freshness = FreshnessStatus(inventory_id=inventory_id)
             db.session.add(freshness)
+            if inventory:
+                inventory.freshness = freshness
         
         # Update freshness data
         freshness.freshness_score = data['freshness_score']
         freshness.confidence_level = data.get('confidence_level', 0.9)
-        freshness.last_checked = datetime.utcnow()
+        now = datetime.utcnow()
+        freshness.last_checked = now
         
         if 'predicted_expiry_date' in data:
             freshness.predicted_expiry_date = datetime.fromisoformat(data['predicted_expiry_date'])
@@ -246,26 +562,30 @@ def update_freshness():
         freshness.update_status()
         
         # Update inventory price if discount changed
-        inventory = db.session.get(FruitInventory, inventory_id)
         if inventory and freshness.discount_percentage != old_discount:
             inventory.current_price = round(
                 inventory.original_price * (1 - freshness.discount_percentage / 100),
                 2
             )
-            inventory.updated_at = datetime.utcnow()
+            inventory.updated_at = now
         
-        db.session.commit()
+        commit_session()
+        
+        # Build the freshness dict once; it is shared by the broadcast, the item and the response
+        freshness_data = freshness.to_dict()
         
         # Broadcast update
         if inventory:
+            item_data = inventory.to_dict(include_freshness=False)
+            item_data['freshness'] = freshness_data
             broadcast_to_admins('freshness_updated', {
                 'inventory_id': inventory_id,
-                'freshness': freshness.to_dict(),
-                'item': inventory.to_dict()
+                'freshness': freshness_data,
+                'item': item_data
             })
         
         # Send alert if ripe or clearance
-        if freshness.status in ['ripe', 'clearance']:
+        if freshness.status in CRITICAL_STATUSES:
             broadcast_to_admins('freshness_alert', {
                 'message': f'Item {inventory.fruit_type} needs attention!',
                 'inventory_id': inventory_id,
@@ -276,10 +596,10 @@ def update_freshness():
         if freshness.discount_percentage > old_discount and freshness.discount_percentage >= 20:
             generate_recommendations_for_item(inventory_id)
         
-        return jsonify({
+        return Response(json_dumps({
             'message': 'Freshness updated successfully',
-            'freshness': freshness.to_dict()
-        }), 200
+            'freshness': freshness_data
+        }), mimetype='application/json'), 200
     
     except Exception as e:
         db.session.rollback()
@@ -296,24 +616,21 @@ def get_freshness(inventory_id):
         return jsonify({'error': str(e)}), 404
 
 
+LIST_STREAM_BATCH = 200
+
+
 @app.route('/api/freshness/critical', methods=['GET'])
 def get_critical_items():
     """Get all items with ripe or clearance freshness"""
     try:
-        critical_items = FreshnessStatus.query.filter(
-            FreshnessStatus.status.in_(['ripe', 'clearance'])
-        ).all()
-        
-        result = []
-        for freshness in critical_items:
-            if freshness.inventory:
-                item_data = freshness.inventory.to_dict()
-                result.append(item_data)
+        # Items joined to their freshness row in one SELECT, streamed in chunks
+        query = FruitInventory.query.join(FruitInventory.freshness).options(
+            contains_eager(FruitInventory.freshness)
+        ).filter(
+            FreshnessStatus.status.in_(CRITICAL_STATUSES)
+        )
         
-        return jsonify({
-            'count': len(result),
-            'items': result
-        }), 200
+        return stream_json_list('items', query.yield_per(LIST_STREAM_BATCH), lambda item: item.to_dict()), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -321,109 +638,200 @@ def get_critical_items():
 
 # ============ Detection Images API ============
 
+# Blemish detection is a Gemini API round trip (network-bound), so a small thread
+# pool overlaps the requests for a category's images instead of running them one by one
+BLEMISH_POOL_WORKERS = 4
+_blemish_pool = ThreadPoolExecutor(max_workers=BLEMISH_POOL_WORKERS, thread_name_prefix='blemish')
+
+# Detections in progress, keyed by (category, filename), so concurrent requests for the
+# same images (e.g. the JSON and SSE endpoints opened together) share one Gemini call
+_inflight_blemish = {}
+_inflight_blemish_lock = threading.Lock()
+
+
+def _has_blemish_data(image_info):
+    """True if the image's metadata already holds blemish detection results"""
+    return bool(
+        image_info.get('metadata') and 
+        'blemishes' in image_info['metadata'] and
+        image_info['metadata']['blemishes'].get('bboxes') is not None
+    )
+
+
+def _store_blemish_metadata(image_info, image_path, blemishes):
+    """Put blemish results into the image's metadata and save its metadata file"""
+    if not image_info.get('metadata'):
+        image_info['metadata'] = {}
+    image_info['metadata']['blemishes'] = blemishes
+    
+    write_metadata(image_path.with_suffix('.json'), image_info['metadata'])
+
+
+def _apply_cached_blemishes(image_info, image_path):
+    """
+    Fill in blemish data from the content-hash cache.
+    
+    Returns:
+        (hit, content_hash) - content_hash is None if the image couldn't be read
+    """
+    try:
+        content_hash = image_content_hash(image_path)
+    except OSError:
+        return False, None
+    
+    blemishes = get_cached_blemishes(content_hash)
+    if blemishes is None:
+        return False, content_hash
+    
+    _store_blemish_metadata(image_info, image_path, blemishes)
+    return True, content_hash
+
+
+def _run_blemish_detection(image_info, image_path, log_prefix, content_hash=None):
+    """
+    Run blemish detection on one image and store the results in its metadata (and metadata file).
+    
+    Returns:
+        dict: The blemish data (or error entry) now in image_info['metadata']['blemishes']
+    """
+    logger.debug("🔍 %s Running blemish detection on %s (no existing data)", log_prefix, image_info['filename'])
+    try:
+        blemish_result = detect_blemishes(str(image_path))
+        blemishes = {
+            'bboxes': blemish_result['bboxes'],
+            'labels': blemish_result['labels'],
+            'count': len(blemish_result['bboxes'])
+        }
+        _store_blemish_metadata(image_info, image_path, blemishes)
+        if content_hash is not None:
+            cache_blemishes(content_hash, blemishes)
+        
+        logger.debug("✅ %s Saved blemish data for %s", log_prefix, image_info['filename'])
+    
+    except Exception as e:
+        print(f"❌ {log_prefix} Error running blemish detection on {image_path}: {e}")
+        # Continue without blemish data if detection fails
+        if not image_info.get('metadata'):
+            image_info['metadata'] = {}
+        image_info['metadata']['blemishes'] = {
+            'error': str(e),
+            'count': 0
+        }
+    return image_info['metadata']['blemishes']
+
+
+def _attach_blemishes(image_info, blemishes):
+    """Set blemish data on an image_info (results may come from another request's detection)"""
+    if not image_info.get('metadata'):
+        image_info['metadata'] = {}
+    image_info['metadata']['blemishes'] = blemishes
+
+
+def _submit_blemish_detection(category, image_info, image_path, log_prefix, content_hash):
+    """
+    Start blemish detection for an image on the pool, or join the detection
+    already running for it.
+    
+    Returns:
+        Future resolving to the image's blemish data
+    """
+    key = (category, image_info['filename'])
+    with _inflight_blemish_lock:
+        future = _inflight_blemish.get(key)
+        if future is not None:
+            logger.debug("🔗 %s Joining in-flight detection for %s", log_prefix, image_info['filename'])
+            return future
+        future = _blemish_pool.submit(_run_blemish_detection, image_info, image_path, log_prefix, content_hash)
+        _inflight_blemish[key] = future
+    
+    def _done(f):
+        with _inflight_blemish_lock:
+            if _inflight_blemish.get(key) is f:
+                del _inflight_blemish[key]
+    future.add_done_callback(_done)
+    return future
+
+
+def _load_detection_images(category, log_prefix):
+    """
+    Top 3 latest processed images for a category (newest first). If none are on
+    disk yet, the latest crops held in memory are saved as processed images first.
+    """
+    category_lower = category.lower()
+    images = get_category_images(category_lower)
+    logger.debug("📁 %s get_category_images returned %s total images", log_prefix, len(images))
+    detection_images = [img for img in images if img['filename'].startswith('processed_')]
+    
+    if not detection_images:
+        logger.debug("📸 %s No processed images on disk for %s, checking memory...", log_prefix, category)
+        memory_images = category_images_memory_cache.get(category_lower)
+        if memory_images:
+            # Take ONLY top 3 from memory (latest first)
+            top_3_memory = memory_images[-3:]
+            logger.debug("💾 %s Saving top %s images from memory to disk for %s", log_prefix, len(top_3_memory), category)
+            
+            for detection in top_3_memory:
+                if 'cropped_image' in detection and detection['cropped_image'] is not None:
+                    save_processed_image(
+                        detection['cropped_image'],
+                        category_lower,
+                        detection.get('metadata')
+                    )
+            
+            # Refresh the list after saving
+            images = get_category_images(category_lower)
+            detection_images = [img for img in images if img['filename'].startswith('processed_')]
+        else:
+            print(f"⚠️  {log_prefix} No images in memory for {category}")
+    
+    # Limit to ONLY top 3 latest images (newest first)
+    detection_images = detection_images[:3]
+    logger.debug("📸 %s Processing ONLY top %s images for %s", log_prefix, len(detection_images), category)
+    if detection_images and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("    Images to process: %s", [img['filename'] for img in detection_images])
+    return detection_images
+
+
+def _start_blemish_detections(category, detection_images, log_prefix):
+    """
+    Fill blemish data for images that already have it (metadata or content-hash
+    cache) and start detection for the rest.
+    
+    Returns:
+        (futures, cache_hits) - {future: image_info} for pending detections, and
+        the image_infos filled from the content-hash cache
+    """
+    futures = {}
+    cache_hits = []
+    for image_info in detection_images:
+        if _has_blemish_data(image_info):
+            logger.debug("⏭️  %s Skipping %s - already has blemish data", log_prefix, image_info['filename'])
+            continue
+        image_path = DETECTION_IMAGES_DIR / category / image_info['filename']
+        hit, content_hash = _apply_cached_blemishes(image_info, image_path)
+        if hit:
+            logger.debug("⚡ %s Blemish cache hit for %s", log_prefix, image_info['filename'])
+            cache_hits.append(image_info)
+            continue
+        futures[_submit_blemish_detection(category, image_info, image_path, log_prefix, content_hash)] = image_info
+    return futures, cache_hits
+
+
 @app.route('/api/detection-images/<category>', methods=['GET'])
 def get_detection_images(category):
     """Get all detection images for a category and run blemish detection"""
     try:
-        print(f"\n🔍 [Detection API] Called for category: {category}")
+        logger.debug("🔍 [Detection API] Called for category: %s", category)
         
-        # Check if there are already processed images on disk
-        images = get_category_images(category.lower())
-        print(f"📁 [Detection API] get_category_images returned {len(images)} total images")
-        if images:
-            print(f"    Image filenames: {[img['filename'] for img in images[:5]]}")
+        detection_images = _load_detection_images(category, '[Detection]')
         
-        detection_images = [img for img in images if img['filename'].startswith('processed_')]
-        print(f"📸 [Detection API] Found {len(detection_images)} processed images")
+        # Run blemish detection on the images that need it, concurrently
+        futures, _ = _start_blemish_detections(category.lower(), detection_images, '[Detection]')
+        for future, image_info in futures.items():
+            _attach_blemishes(image_info, future.result())
+        images_with_blemishes = detection_images
         
-        # If NO processed images on disk, take top 3 from memory and save them
-        if not detection_images:
-            print(f"📸 [Detection] No processed images on disk for {category}, checking memory...")
-            category_lower = category.lower()
-            
-            if category_lower in category_images_memory_cache and category_images_memory_cache[category_lower]:
-                memory_images = category_images_memory_cache[category_lower]
-                # Take ONLY top 3 from memory (latest first)
-                top_3_memory = memory_images[-3:] if len(memory_images) >= 3 else memory_images
-                
-                print(f"💾 [Detection] Saving top {len(top_3_memory)} images from memory to disk for {category}")
-                
-                for detection in top_3_memory:
-                    if 'cropped_image' in detection and detection['cropped_image'] is not None:
-                        save_processed_image(
-                            detection['cropped_image'],
-                            category_lower,
-                            detection.get('metadata')
-                        )
-                
-                # Refresh the list after saving
-                images = get_category_images(category_lower)
-                detection_images = [img for img in images if img['filename'].startswith('processed_')]
-            else:
-                print(f"⚠️  [Detection] No images in memory for {category}")
-                return jsonify({
-                    'category': category,
-                    'count': 0,
-                    'images': []
-                }), 200
-        
-        # Limit to ONLY top 3 latest images (newest first)
-        detection_images = detection_images[:3]
-        
-        print(f"📸 [Detection] Processing ONLY top {len(detection_images)} images for {category}")
-        if detection_images:
-            print(f"    Images to process: {[img['filename'] for img in detection_images]}")
-        
-        # Run blemish detection on each image (only if needed)
-        images_with_blemishes = []
-        for image_info in detection_images:
-            image_path = DETECTION_IMAGES_DIR / category.lower() / image_info['filename']
-            
-            # Check if blemish detection already exists in metadata
-            has_blemish_data = (
-                image_info.get('metadata') and 
-                'blemishes' in image_info['metadata'] and
-                image_info['metadata']['blemishes'].get('bboxes') is not None
-            )
-            
-            if not has_blemish_data:
-                print(f"🔍 [Detection] Running blemish detection on {image_info['filename']} (no existing data)")
-                # Run blemish detection
-                try:
-                    blemish_result = detect_blemishes(str(image_path))
-                    
-                    # Update metadata with blemish results
-                    if not image_info.get('metadata'):
-                        image_info['metadata'] = {}
-                    
-                    image_info['metadata']['blemishes'] = {
-                        'bboxes': blemish_result['bboxes'],
-                        'labels': blemish_result['labels'],
-                        'count': len(blemish_result['bboxes'])
-                    }
-                    
-                    # Save updated metadata
-                    metadata_path = image_path.with_suffix('.json')
-                    with open(metadata_path, 'w') as f:
-                        json.dump(image_info['metadata'], f, indent=2, default=str)
-                    
-                    print(f"✅ [Detection] Saved blemish data for {image_info['filename']}")
-                        
-                except Exception as e:
-                    print(f"❌ [Detection] Error running blemish detection on {image_path}: {e}")
-                    # Continue without blemish data if detection fails
-                    if not image_info.get('metadata'):
-                        image_info['metadata'] = {}
-                    image_info['metadata']['blemishes'] = {
-                        'error': str(e),
-                        'count': 0
-                    }
-            else:
-                print(f"⏭️  [Detection] Skipping {image_info['filename']} - already has blemish data")
-            
-            images_with_blemishes.append(image_info)
-        
-        print(f"📤 [Detection] Returning {len(images_with_blemishes)} images for {category}")
+        logger.debug("📤 [Detection] Returning %s images for %s", len(images_with_blemishes), category)
         
         return jsonify({
             'category': category,
@@ -447,7 +855,7 @@ def _save_memory_images_to_disk(category: str):
     # Take ONLY top 3 from memory (latest first)
     top_3_memory = memory_images[-3:] if len(memory_images) >= 3 else memory_images
     
-    print(f"💾 [Main] Saving top {len(top_3_memory)} images from memory to disk for {category_lower}")
+    logger.debug("💾 [Main] Saving top %s images from memory to disk for %s", len(top_3_memory), category_lower)
     
     # Save only top 3 images from memory to disk
     for detection in top_3_memory:
@@ -469,107 +877,39 @@ def get_detection_images_stream(category):
     def generate():
         try:
             # Send initial connection message
-            yield f"data: {json.dumps({'type': 'connected', 'message': 'SSE connection established'})}\n\n"
-            
-            # Check if there are already processed images on disk
-            images = get_category_images(category.lower())
-            detection_images = [img for img in images if img['filename'].startswith('processed_')]
+            yield sse_event({'type': 'connected', 'message': 'SSE connection established'})
             
-            # If NO processed images on disk, take top 3 from memory and save them
+            detection_images = _load_detection_images(category, '[Detection Stream]')
             if not detection_images:
-                print(f"📸 [Detection Stream] No processed images on disk for {category}, checking memory...")
-                category_lower = category.lower()
-                
-                if category_lower in category_images_memory_cache and category_images_memory_cache[category_lower]:
-                    memory_images = category_images_memory_cache[category_lower]
-                    # Take ONLY top 3 from memory (latest first)
-                    top_3_memory = memory_images[-3:] if len(memory_images) >= 3 else memory_images
-                    
-                    print(f"💾 [Detection Stream] Saving top {len(top_3_memory)} images from memory to disk for {category}")
-                    
-                    for detection in top_3_memory:
-                        if 'cropped_image' in detection and detection['cropped_image'] is not None:
-                            save_processed_image(
-                                detection['cropped_image'],
-                                category_lower,
-                                detection.get('metadata')
-                            )
-                    
-                    # Refresh the list after saving
-                    images = get_category_images(category_lower)
-                    detection_images = [img for img in images if img['filename'].startswith('processed_')]
-                else:
-                    print(f"⚠️  [Detection Stream] No images in memory for {category}")
-                yield f"data: {json.dumps({'type': 'complete', 'progress': 100, 'images': []})}\n\n"
+                yield sse_event({'type': 'complete', 'progress': 100, 'images': []})
                 return
-            
-            # Limit to ONLY top 3 latest images (newest first)
-            detection_images = detection_images[:3]
             total_images = len(detection_images)
             
-            print(f"📸 [Detection Stream] Processing ONLY top {total_images} images for {category}")
+            # Submit every image that needs blemish detection up front so the calls overlap,
+            # then report progress as each one finishes
+            futures, cache_hits = _start_blemish_detections(category.lower(), detection_images, '[Detection Stream]')
+            completed = total_images - len(futures) - len(cache_hits)
+            for image_info in cache_hits:
+                # Instant result from the content-hash cache
+                completed += 1
+                progress = int((completed / total_images) * 100)
+                yield sse_event({'type': 'progress', 'progress': progress, 'current': completed, 'total': total_images, 'filename': image_info['filename'], 'cached': True})
             
-            images_with_blemishes = []
-            for idx, image_info in enumerate(detection_images):
-                image_path = DETECTION_IMAGES_DIR / category.lower() / image_info['filename']
-                
-                # Send progress update before processing
-                progress = int((idx / total_images) * 100)
-                yield f"data: {json.dumps({'type': 'progress', 'progress': progress, 'current': idx + 1, 'total': total_images, 'filename': image_info['filename']})}\n\n"
-                
-                # Check if blemish detection already exists in metadata
-                has_blemish_data = (
-                    image_info.get('metadata') and 
-                    'blemishes' in image_info['metadata'] and
-                    image_info['metadata']['blemishes'].get('bboxes') is not None
-                )
-                
-                if not has_blemish_data:
-                    print(f"🔍 [Detection Stream] Running blemish detection on {image_info['filename']} (no existing data)")
-                    # Run blemish detection
-                    try:
-                        blemish_result = detect_blemishes(str(image_path))
-                        
-                        # Update metadata with blemish results
-                        if not image_info.get('metadata'):
-                            image_info['metadata'] = {}
-                        
-                        image_info['metadata']['blemishes'] = {
-                            'bboxes': blemish_result['bboxes'],
-                            'labels': blemish_result['labels'],
-                            'count': len(blemish_result['bboxes'])
-                        }
-                        
-                        # Save updated metadata
-                        metadata_path = image_path.with_suffix('.json')
-                        with open(metadata_path, 'w') as f:
-                            json.dump(image_info['metadata'], f, indent=2, default=str)
-                        
-                        print(f"✅ [Detection Stream] Saved blemish data for {image_info['filename']}")
-                        
-                    except Exception as e:
-                        print(f"❌ [Detection Stream] Error running blemish detection on {image_path}: {e}")
-                        # Continue without blemish data if detection fails
-                        if not image_info.get('metadata'):
-                            image_info['metadata'] = {}
-                        image_info['metadata']['blemishes'] = {
-                            'error': str(e),
-                            'count': 0
-                        }
-                else:
-                    print(f"⏭️  [Detection Stream] Skipping {image_info['filename']} - already has blemish data")
-                
-                images_with_blemishes.append(image_info)
-                
-                # Send progress update after processing
-                progress = int(((idx + 1) / total_images) * 100)
-                yield f"data: {json.dumps({'type': 'progress', 'progress': progress, 'current': idx + 1, 'total': total_images, 'filename': image_info['filename']})}\n\n"
+            yield sse_event({'type': 'progress', 'progress': int((completed / total_images) * 100), 'current': completed, 'total': total_images})
+            
+            for future in as_completed(futures):
+                _attach_blemishes(futures[future], future.result())
+                completed += 1
+                progress = int((completed / total_images) * 100)
+                yield sse_event({'type': 'progress', 'progress': progress, 'current': completed, 'total': total_images, 'filename': futures[future]['filename']})
+            
+            images_with_blemishes = detection_images
             
             # Send final result
-            yield f"data: {json.dumps({'type': 'complete', 'progress': 100, 'category': category, 'count': len(images_with_blemishes), 'images': images_with_blemishes})}\n\n"
+            yield sse_event({'type': 'complete', 'progress': 100, 'category': category, 'count': len(images_with_blemishes), 'images': images_with_blemishes})
             
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield sse_event({'type': 'error', 'error': str(e)})
     
     # Create response with proper SSE headers
     response = Response(
@@ -602,6 +942,14 @@ def get_all_detection_categories():
 def serve_detection_image(filename):
     """Serve detection images"""
     try:
+        if IMAGE_SENDFILE == 'x-accel':
+            # Only headers leave Python; nginx sends the file from its internal location
+            path = safe_join(str(DETECTION_IMAGES_DIR), filename)
+            if path is None or not os.path.isfile(path):
+                return jsonify({'error': 'Image not found'}), 404
+            resp = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            resp.headers['X-Accel-Redirect'] = X_ACCEL_DETECTION_PREFIX + filename
+            return resp
         return send_from_directory('detection_images', filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 404
@@ -610,14 +958,23 @@ def serve_detection_image(filename):
 # ============ Customer Management API ============
 
 @app.route('/api/customers', methods=['GET'])
+@cached(ttl=30)
 def get_customers():
-    """Get all customers"""
+    """Get all customers (?view=summary returns only the list columns)"""
     try:
-        customers = Customer.query.all()
-        return jsonify({
+        if request.args.get('view') == 'summary':
+            customers = Customer.query.options(
+                load_only(Customer.id, Customer.knot_customer_id, Customer.name, Customer.email)
+            ).all()
+            customer_list = [c.to_dict_list() for c in customers]
+        else:
+            customers = Customer.query.all()
+            customer_list = [c.to_dict() for c in customers]
+        
+        return Response(json_dumps({
             'count': len(customers),
-            'customers': [c.to_dict() for c in customers]
-        }), 200
+            'customers': customer_list
+        }), mimetype='application/json'), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -636,22 +993,25 @@ def get_customer(customer_id):
 def get_customer_purchases(customer_id):
     """Get customer's purchase history"""
     try:
-        # Verify customer exists
-        customer = Customer.query.get_or_404(customer_id)
-        
-        # Get purchases ordered by most recent first
-        purchases = PurchaseHistory.query.filter_by(
-            customer_id=customer_id
-        ).order_by(PurchaseHistory.purchase_date.desc()).all()
-        
-        return jsonify({
-            'count': len(purchases),
-            'customer': {
-                'id': customer.id,
-                'name': customer.name
-            },
-            'purchases': [p.to_dict() for p in purchases]
-        }), 200
+        # Verify customer exists (only the columns the response needs)
+        customer = _get_customer_summary(customer_id)
+        if customer is None:
+            return jsonify({'error': 'Customer not found'}), 404
+        
+        # Purchases ordered by most recent first, joined to their item, streamed in chunks
+        # Only fruit_type is read from the joined item, so don't select its other columns
+        query = PurchaseHistory.query.outerjoin(PurchaseHistory.inventory).options(
+            contains_eager(PurchaseHistory.inventory).load_only(FruitInventory.id, FruitInventory.fruit_type)
+        ).filter(
+            PurchaseHistory.customer_id == customer_id
+        ).order_by(PurchaseHistory.purchase_date.desc())
+        
+        return stream_json_list(
+            'purchases',
+            query.yield_per(LIST_STREAM_BATCH),
+            lambda purchase: purchase.to_dict(),
+            head={'customer': {'id': customer['id'], 'name': customer['name']}}
+        ), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
@@ -660,27 +1020,29 @@ def get_customer_purchases(customer_id):
 def get_customer_knot_transactions(customer_id):
     """Get customer's original Knot transaction data"""
     try:
-        customer = Customer.query.get_or_404(customer_id)
+        customer = _get_customer_summary(customer_id)
+        if customer is None:
+            return jsonify({'error': 'Customer not found'}), 404
         
-        if not customer.knot_customer_id:
+        knot_customer_id = customer['knot_customer_id']
+        if not knot_customer_id:
             return jsonify({
                 'error': 'Customer not connected to Knot',
                 'transactions': []
             }), 200
         
-        # Fetch fresh transactions from Knot
-        transactions = knot_client.get_customer_transactions(
-            customer.knot_customer_id,
-            limit=25
-        )
+        # Fetch transactions from Knot (cached unless ?fresh=1)
+        cache_key = ('transactions', knot_customer_id, 25)
+        load_transactions = lambda: knot_client.get_customer_transactions(knot_customer_id, limit=25)
+        if request.args.get('fresh') == '1':
+            transactions = load_transactions()
+            knot_response_cache.set(cache_key, transactions)
+        else:
+            transactions = knot_response_cache.get_or_load(cache_key, load_transactions)
         
         return jsonify({
             'count': len(transactions),
-            'customer': {
-                'id': customer.id,
-                'name': customer.name,
-                'knot_customer_id': customer.knot_customer_id
-            },
+            'customer': customer,
             'transactions': transactions
         }), 200
     except Exception as e:
@@ -725,7 +1087,8 @@ def create_customer():
             customer.set_preferences(data['preferences'])
         
         db.session.add(customer)
-        db.session.commit()
+        commit_session()
+        clear_prefix('/api/customers')
         
         return jsonify({
             'message': 'Customer created',
@@ -787,7 +1150,9 @@ def sync_from_knot(external_user_id):
         # Update preferences
         customer.set_preferences(sync_data['preferences'])
         
-        db.session.commit()
+        commit_session()
+        clear_prefix('/api/customers')
+        customer_summary_cache.pop(customer.id)
         
         return jsonify({
             'message': 'Customer synced from Knot',
@@ -815,13 +1180,20 @@ def test_knot_connection():
         else:
             test_user = 'user123'
         
-        sync_data = knot_client.sync_customer_data(test_user)
+        cache_key = ('sync', test_user)
+        load_sync = lambda: knot_client.sync_customer_data(test_user) or None
+        if request.args.get('fresh') == '1':
+            sync_data = load_sync()
+            if sync_data:
+                knot_response_cache.set(cache_key, sync_data)
+        else:
+            sync_data = knot_response_cache.get_or_load(cache_key, load_sync)
         
         if sync_data:
             return jsonify({
                 'status': 'success',
                 'message': 'Knot API connection working',
-                'mode': 'mock' if hasattr(knot_client, 'mock_data') else 'real',
+                'mode': 'mock' if KNOT_IS_MOCK else 'real',
                 'environment': knot_env,
                 'test_user': test_user,
                 'sample_data': sync_data
@@ -918,16 +1290,50 @@ def list_knot_merchants():
 # ============ Recommendations API ============
 @app.route('/api/recommendations/<int:customer_id>', methods=['GET'])
 def get_recommendations(customer_id):
-    """Get personalized recommendations for customer"""
+    """Get personalized recommendations for customer (?view=summary returns flat rows from one join)"""
     try:
-        recommendations = Recommendation.query.filter_by(
-            customer_id=customer_id,
-            purchased=False
-        ).order_by(Recommendation.priority_score.desc()).all()
+        if request.args.get('view') == 'summary':
+            # Plain column rows, no ORM objects to hydrate
+            rows = db.session.execute(
+                select(
+                    Recommendation.id,
+                    Recommendation.inventory_id,
+                    Recommendation.priority_score,
+                    Recommendation.sent_at,
+                    Recommendation.viewed,
+                    FruitInventory.fruit_type,
+                    FruitInventory.original_price,
+                    FruitInventory.current_price,
+                    FruitInventory.thumbnail_path,
+                    FreshnessStatus.freshness_score,
+                    FreshnessStatus.discount_percentage,
+                    FreshnessStatus.status
+                ).join(
+                    FruitInventory, Recommendation.inventory_id == FruitInventory.id
+                ).outerjoin(
+                    FreshnessStatus, FreshnessStatus.inventory_id == FruitInventory.id
+                ).where(
+                    Recommendation.customer_id == customer_id,
+                    Recommendation.purchased == False
+                ).order_by(Recommendation.priority_score.desc())
+            ).mappings().all()
+            recommendation_list = [
+                {**row, 'sent_at': row['sent_at'].isoformat() if row['sent_at'] else None}
+                for row in rows
+            ]
+        else:
+            # One joined query for recommendations, their items and freshness
+            recommendations = Recommendation.query.options(
+                joinedload(Recommendation.inventory).joinedload(FruitInventory.freshness)
+            ).filter_by(
+                customer_id=customer_id,
+                purchased=False
+            ).order_by(Recommendation.priority_score.desc()).all()
+            recommendation_list = [r.to_dict() for r in recommendations]
         
         return jsonify({
-            'count': len(recommendations),
-            'recommendations': [r.to_dict() for r in recommendations]
+            'count': len(recommendation_list),
+            'recommendations': recommendation_list
         }), 200
     
     except Exception as e:
@@ -938,16 +1344,17 @@ def get_recommendations(customer_id):
 def trigger_recommendations():
     """Manually trigger recommendation generation for all discounted items"""
     try:
-        # Get all items with discount >= 20%
-        items = FruitInventory.query.join(FreshnessStatus).filter(
+        # Count items with discount >= 20% (the candidates are re-selected by the same filter in SQL)
+        item_count = db.session.query(func.count(FreshnessStatus.id)).filter(
             FreshnessStatus.discount_percentage >= 20
-        ).all()
+        ).scalar()
         
-        for item in items:
-            generate_recommendations_for_item(item.id)
+        # One background pass: two reads, one bulk insert, one commit
+        if item_count:
+            generate_recommendations_bulk(min_discount=20)
         
         return jsonify({
-            'message': f'Generated recommendations for {len(items)} items'
+            'message': f'Generated recommendations for {item_count} items'
         }), 200
     
     except Exception as e:
@@ -960,23 +1367,27 @@ def trigger_recommendations():
 def get_waste_analytics():
     """Get waste prevention metrics"""
     try:
-        waste_logs = WasteLog.query.all()
-        
-        total_wasted = sum(log.quantity_wasted for log in waste_logs)
-        total_value_loss = sum(log.estimated_value_loss or 0 for log in waste_logs)
+        # Totals are aggregated in SQL instead of hydrating every log row
+        total_wasted, total_value_loss = db.session.query(
+            func.coalesce(func.sum(WasteLog.quantity_wasted), 0),
+            func.coalesce(func.sum(WasteLog.estimated_value_loss), 0)
+        ).one()
         
         # Count items by discount that were sold (not wasted)
-        discounted_items = FruitInventory.query.join(FreshnessStatus).filter(
-            FreshnessStatus.discount_percentage > 0
-        ).all()
+        items_saved = db.session.query(func.count(FruitInventory.id)).join(FreshnessStatus).filter(
+            FreshnessStatus.discount_percentage > 0,
+            FruitInventory.quantity == 0
+        ).scalar()
         
-        items_saved = sum(1 for item in discounted_items if item.quantity == 0)
+        waste_logs = WasteLog.query.options(selectinload(WasteLog.inventory)).order_by(
+            WasteLog.id.desc()
+        ).limit(10).all()
         
         return jsonify({
             'total_wasted': total_wasted,
             'total_value_loss': total_value_loss,
             'items_saved': items_saved,
-            'waste_logs': [log.to_dict() for log in waste_logs[:10]]  # Last 10
+            'waste_logs': [log.to_dict() for log in waste_logs]  # Last 10
         }), 200
     
     except Exception as e:
@@ -988,7 +1399,7 @@ def get_waste_analytics():
 @sock.route('/ws/admin')
 def admin_websocket(ws):
     """WebSocket for admin dashboard - real-time updates"""
-    admin_connections.add(ws)
+    add_admin_connection(ws)
     try:
         # Send welcome message
         ws.send(json.dumps({
@@ -1005,31 +1416,25 @@ def admin_websocket(ws):
                 try:
                     request_data = json.loads(data)
                     if request_data.get('action') == 'get_stats':
-                        # Send current stats
-                        inventory_count = FruitInventory.query.count()
-                        critical_count = FreshnessStatus.query.filter(FreshnessStatus.status.in_(['ripe', 'clearance'])).count()
-                        
+                        # Send current stats (briefly cached, see get_admin_stats)
                         ws.send(json.dumps({
                             'type': 'stats',
-                            'data': {
-                                'inventory_count': inventory_count,
-                                'critical_count': critical_count
-                            }
+                            'data': get_admin_stats()
                         }))
                 except json.JSONDecodeError:
                     pass
     
     except Exception as e:
-        print(f"Admin WebSocket error: {e}")
+        logger.warning("Admin WebSocket error: %s", e)
     finally:
-        admin_connections.discard(ws)
+        remove_admin_connection(ws)
 
 
 @sock.route('/ws/customer/<int:customer_id>')
 def customer_websocket(ws, customer_id):
     """WebSocket for customer app - real-time notifications"""
-    print(f"🔌 Customer {customer_id} connecting to WebSocket...")
-    customer_connections[customer_id] = ws
+    logger.debug("🔌 Customer %s connecting to WebSocket...", customer_id)
+    add_customer_connection(customer_id, ws)
     
     try:
         # Send welcome message
@@ -1039,7 +1444,7 @@ def customer_websocket(ws, customer_id):
             'customer_id': customer_id,
             'timestamp': datetime.utcnow().isoformat()
         }))
-        print(f"✅ Customer {customer_id} WebSocket connected")
+        logger.info("✅ Customer %s WebSocket connected", customer_id)
         
         # Keep connection alive and listen for messages
         while True:
@@ -1054,19 +1459,17 @@ def customer_websocket(ws, customer_id):
                             rec = db.session.get(Recommendation, rec_id)
                             if rec:
                                 rec.viewed = True
-                                db.session.commit()
-                                print(f"✓ Customer {customer_id} viewed recommendation {rec_id}")
+                                commit_session()
+                                logger.debug("✓ Customer %s viewed recommendation %s", customer_id, rec_id)
                 except json.JSONDecodeError as e:
-                    print(f"⚠️  Customer {customer_id} sent invalid JSON: {e}")
+                    logger.warning("⚠️  Customer %s sent invalid JSON: %s", customer_id, e)
     
     except Exception as e:
-        print(f"❌ Customer {customer_id} WebSocket error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.warning("❌ Customer %s WebSocket error: %s", customer_id, e,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     finally:
-        if customer_id in customer_connections:
-            del customer_connections[customer_id]
-        print(f"🔌 Customer {customer_id} WebSocket disconnected")
+        remove_customer_connection(customer_id, ws)
+        logger.info("🔌 Customer %s WebSocket disconnected", customer_id)
 
 
 # ============ Video Streaming Helper Functions ============
@@ -1082,98 +1485,149 @@ def _initialize_proxy_state():
             'last_updated_time': {},
             'last_detection_time': 0,
             'cached_detections': [],
-            'frame_times': [],
-            'last_frame_time': time.time(),
-            'fps_window_size': 30
+            'fps_window': FpsWindow(window_size=30),
+            'scene_gate': SceneChangeGate(),
+            'last_frame_time': time.time()
         }
         
-        # Load initial inventory and get default store
-        with app.app_context():
-            default_store = Store.query.first()
-            if not default_store:
-                default_store = Store(
-                    name="Default Store",
-                    location="Camera Detection",
-                    contact_info="N/A"
-                )
-                db.session.add(default_store)
-                db.session.commit()
-                print(f"✅ Created default store with ID: {default_store.id}")
-            proxy_state_global['default_store_id'] = default_store.id
-            
-            items = FruitInventory.query.all()
-            for item in items:
-                if item.fruit_type not in proxy_state_global['inventory_cache']:
-                    proxy_state_global['inventory_cache'][item.fruit_type] = (item.id, item.quantity)
+        # Inventory entries are loaded lazily per detected class (see _get_inventory_entry)
+        proxy_state_global['default_store_id'] = _get_default_store_id()
     
     return proxy_state_global
 
 
-def _initialize_local_camera_state():
-    """Initialize state for local camera mode"""
-    inventory_cache = {}
-    default_store_id = None
-    
+def _get_default_store_id():
+    """Return the id of the store camera detections are filed under, creating it if needed"""
     with app.app_context():
-        default_store = Store.query.first()
-        if not default_store:
+        store_id = db.session.query(Store.id).limit(1).scalar()
+        if store_id is None:
             default_store = Store(
                 name="Default Store",
                 location="Camera Detection",
                 contact_info="N/A"
             )
             db.session.add(default_store)
-            db.session.commit()
-            print(f"✅ Created default store with ID: {default_store.id}")
-        default_store_id = default_store.id
-        
-        items = FruitInventory.query.all()
-        for item in items:
-            if item.fruit_type not in inventory_cache:
-                inventory_cache[item.fruit_type] = (item.id, item.quantity)
+            commit_session()
+            clear_prefix('/api/stores')
+            store_id = default_store.id
+            print(f"✅ Created default store with ID: {store_id}")
+        return store_id
+
+
+def _initialize_local_camera_state():
+    """Initialize state for local camera mode"""
+    # Inventory entries are loaded lazily per detected class (see _get_inventory_entry)
+    return {}, _get_default_store_id()
+
+
+# The detection thread owns the quantities in an inventory cache; the camera DB
+# writer only fills in item ids once rows exist. Both sides update entries under
+# this lock so neither overwrites a newer value from the other.
+_inventory_cache_lock = threading.Lock()
+
+
+def _get_inventory_entry(inventory_cache, fruit_type):
+    """
+    Return the cached (item_id, quantity) for a fruit type, loading it from the
+    database on first sight. Only classes the camera actually detects are fetched.
+    
+    Returns:
+        (item_id, quantity) tuple, or None if no inventory row exists yet
+    """
+    entry = inventory_cache.get(fruit_type)
+    if entry is not None:
+        return entry
+    
+    with app.app_context():
+        row = db.session.query(FruitInventory.id, FruitInventory.quantity).filter_by(
+            fruit_type=fruit_type
+        ).order_by(FruitInventory.id).first()
+    if row is None:
+        return None
     
-    return inventory_cache, default_store_id
+    with _inventory_cache_lock:
+        return inventory_cache.setdefault(fruit_type, (row.id, row.quantity))
+
+
+def _settle_inventory_id(inventory_cache, fruit_type, stale_id, item_id):
+    """
+    Record the database id for a fruit type after the DB writer created or found its row.
+    Only replaces a placeholder (None) or the stale id the update was prepared with,
+    and keeps the cached quantity, which may already be newer than the written one.
+    """
+    with _inventory_cache_lock:
+        entry = inventory_cache.get(fruit_type)
+        if entry is not None and entry[0] in (None, stale_id):
+            inventory_cache[fruit_type] = (item_id, entry[1])
+
+
+DETECTION_CLASSES = ['apple', 'banana', 'orange']
 
 
-def _process_detections(frame, detections, min_confidence=0.6):
-    """Process YOLO detections and add freshness scores"""
+def _detect_and_process(frame, min_confidence=0.6):
+    """Run YOLO and freshness scoring on a frame, in the inference worker when enabled"""
+    if inference_worker is not None:
+        detections = inference_worker.detect(frame, DETECTION_CLASSES, min_confidence)
+        if detections is not None:
+            return _process_detections(frame, detections, min_confidence, scored=True)
+    
+    result = detect(frame, allowed_classes=DETECTION_CLASSES, save=False, verbose=False, max_side=DETECT_MAX_SIDE)
+    return _process_detections(frame, result['detections'], min_confidence)
+
+
+def _process_detections(frame, detections, min_confidence=0.6, scored=False):
+    """
+    Process YOLO detections and add freshness scores
+    
+    Args:
+        scored: True if detections already carry 'freshness_score' (from the inference worker)
+    """
     processed_detections = []
     
-    for detection in detections:
-        if detection['confidence'] < min_confidence:
-            continue
-        
+    confident = [d for d in detections if d['confidence'] >= min_confidence]
+    crops = crop_bounding_boxes(frame, [d['bbox'] for d in confident])
+    
+    # Score every valid crop of the frame in one batched forward pass
+    freshness_scores = [None] * len(confident)
+    if scored:
+        freshness_scores = [d.get('freshness_score') for d in confident]
+    elif _inference_worker_active():
+        # Frames the worker couldn't take stay unscored rather than loading a second model copy here
+        pass
+    elif confident and get_fresh_model()[0] is not None:
+        fresh_model, fresh_device, fresh_transform = get_fresh_model()
+        valid = [i for i, cropped in enumerate(crops) if cropped is not None]
+        scores = get_freshness_scores([crops[i] for i in valid], fresh_model, fresh_device, fresh_transform)
+        for i, score in zip(valid, scores):
+            freshness_scores[i] = score
+    elif confident:
+        global _fresh_model_warning_shown
+        if not _fresh_model_warning_shown:
+            print(f"⚠️ Fresh model not loaded - freshness scores will be None")
+            _fresh_model_warning_shown = True
+    
+    # Every detection of a frame shares one timestamp
+    timestamp = datetime.utcnow().isoformat() if confident else None
+    
+    for detection, cropped, freshness_score in zip(confident, crops, freshness_scores):
         bbox = detection['bbox']
         class_name = detection['class']
-        confidence = detection['confidence']
-        
-        # Get freshness score if model is loaded
-        freshness_score = None
-        cropped = None
-        if fresh_model is not None:
-            cropped = crop_bounding_box(frame, bbox)
-            if cropped is not None:
-                freshness_score = get_freshness_score(cropped, fresh_model, fresh_device, fresh_transform)
-        else:
-            cropped = crop_bounding_box(frame, bbox)
-            global _fresh_model_warning_shown
-            if not _fresh_model_warning_shown:
-                print(f"⚠️ Fresh model not loaded - freshness scores will be None")
-                _fresh_model_warning_shown = True
+        confidence = float(detection['confidence'])
+        freshness_score = float(freshness_score) if freshness_score is not None else None
         
         # Store cropped image and metadata
         if cropped is not None:
             metadata = {
-                'confidence': float(confidence),
-                'freshness_score': float(freshness_score) if freshness_score is not None else None,
-                'timestamp': datetime.utcnow().isoformat(),
+                'confidence': confidence,
+                'freshness_score': freshness_score,
+                'timestamp': timestamp,
                 'bbox': bbox
             }
             detection_dict = {
                 'bbox': bbox,
                 'class': class_name,
-                'confidence': float(confidence),
-                'freshness_score': float(freshness_score) if freshness_score is not None else None,
+                'confidence': confidence,
+                'freshness_score': freshness_score,
                 'cropped_image': cropped,
                 'metadata': metadata
             }
@@ -1188,8 +1642,8 @@ def _process_detections(frame, detections, min_confidence=0.6):
             processed_detections.append({
                 'bbox': bbox,
                 'class': class_name,
-                'confidence': float(confidence),
-                'freshness_score': float(freshness_score) if freshness_score is not None else None
+                'confidence': confidence,
+                'freshness_score': freshness_score
             })
     
     return processed_detections
@@ -1226,19 +1680,180 @@ def _count_detected_classes(processed_detections):
     return current_class_counts
 
 
-def _calculate_fps(frame_times, window_size=30):
-    """Calculate FPS from frame times"""
-    if len(frame_times) > window_size:
-        frame_times.pop(0)
+class FpsWindow:
+    """Rolling FPS over the last window_size frame times, O(1) per frame"""
+    
+    def __init__(self, window_size=30):
+        self.frame_times = deque(maxlen=window_size)
+        self.total = 0.0
+    
+    def add(self, frame_time):
+        """Record one frame time and return the current FPS"""
+        if len(self.frame_times) == self.frame_times.maxlen:
+            # deque drops the oldest entry on append; take it out of the sum first
+            self.total -= self.frame_times[0]
+        self.frame_times.append(frame_time)
+        self.total += frame_time
+        return len(self.frame_times) / self.total if self.total > 0 else 0.0
+
+
+# Detection is skipped while the scene is static: frames are compared as 32x32 grayscale
+# thumbnails against the last frame that was detected. A detection still runs at least
+# every SCENE_MAX_SKIP_SECONDS so slow changes (lighting, ripening) are picked up.
+SCENE_DIFF_THRESHOLD = float(os.getenv('SCENE_DIFF_THRESHOLD', '3.0'))  # mean abs gray-level diff
+SCENE_MAX_SKIP_SECONDS = 2.0
+
+
+class SceneChangeGate:
+    """Decides whether a frame differs enough from the last detected frame to detect again"""
+    
+    def __init__(self):
+        self.signature = None
+        self.detected_at = 0.0
     
-    if len(frame_times) > 0:
-        avg_frame_time = sum(frame_times) / len(frame_times)
-        return 1.0 / avg_frame_time if avg_frame_time > 0 else 0.0
-    return 0.0
+    def should_detect(self, frame, now):
+        """Return True (and remember this frame) if detection should run on frame"""
+        # OpenCV calls only (no NumPy temporaries), so the GIL is released throughout
+        small = cv2.cvtColor(cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if (self.signature is not None
+                and now - self.detected_at < SCENE_MAX_SKIP_SECONDS
+                and cv2.mean(cv2.absdiff(small, self.signature))[0] < SCENE_DIFF_THRESHOLD):
+            return False
+        self.signature = small
+        self.detected_at = now
+        return True
+
+
+def _put_latest(q, item):
+    """Put item into a single-slot queue, replacing whatever is still pending"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+# Frames waiting for JPEG encode + send. One slot: if the encoder is still busy
+# the pending frame is replaced, so the capture loop never waits and viewers
+# always get the newest frame.
+_frame_encode_queue = queue.Queue(maxsize=1)
+
+# Latest encoded JPEG for /stream.mjpeg clients; frame ids match frame_meta.frame_id
+_mjpeg_condition = threading.Condition()
+_mjpeg_latest = (0, None)  # (frame_id, jpeg buffer)
+_mjpeg_clients = 0
+
+
+JPEG_QUALITY = 85
+
+# JPEG_GPU_ENCODE=true encodes stream frames with nvJPEG (torchvision.io.encode_jpeg on
+# CUDA) so the per-frame encode leaves the CPU; only the compressed bytes come back
+_gpu_jpeg_encode = None
+if os.getenv('JPEG_GPU_ENCODE', 'false').lower() == 'true':
+    try:
+        import torch
+        from torchvision.io import encode_jpeg
+        if torch.cuda.is_available():
+            def _gpu_jpeg_encode(frame):
+                """Encode a BGR HWC uint8 frame to JPEG bytes on the GPU"""
+                tensor = torch.from_numpy(frame).to('cuda', non_blocking=True)
+                # BGR HWC -> RGB CHW on the device
+                tensor = tensor.flip(-1).permute(2, 0, 1).contiguous()
+                return memoryview(encode_jpeg(tensor, quality=JPEG_QUALITY).cpu().numpy())
+            print("✅ Encoding stream frames on the GPU")
+        else:
+            print("⚠️ JPEG_GPU_ENCODE is set but CUDA is not available; encoding on CPU")
+    except ImportError as e:
+        print(f"⚠️ GPU JPEG encoding unavailable, encoding on CPU: {e}")
+
+
+def _encode_jpeg(frame):
+    """
+    Encode a frame to JPEG, on the GPU when enabled (falling back to OpenCV).
+    
+    Returns:
+        memoryview: Flat view over the encoder's output buffer (no copy into bytes)
+    """
+    global _gpu_jpeg_encode
+    if _gpu_jpeg_encode is not None:
+        try:
+            return _gpu_jpeg_encode(frame)
+        except Exception as e:
+            print(f"⚠️ GPU JPEG encode failed, switching to CPU: {e}")
+            _gpu_jpeg_encode = None
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return memoryview(buffer.reshape(-1))
+
+
+def _frame_encoder_worker():
+    """Encode queued frames to JPEG and send them to every frontend connection"""
+    global _mjpeg_latest
+    frame_id = 0
+    while True:
+        frame, clean_detections, fps = _frame_encode_queue.get()
+        frame_id += 1
+        try:
+            # Encode frame to JPEG
+            frame_bytes = _encode_jpeg(frame)
+            
+            # One binary message per frame: <uint32 LE meta length><meta JSON><JPEG>
+            # Same timestamp and metadata for every connection of this frame
+            timestamp = datetime.utcnow().isoformat()
+            meta_bytes = json_dumps_bytes({
+                'type': 'frame_meta',
+                'frame_id': frame_id,
+                'detections': clean_detections,
+                'fps': round(fps, 2),
+                'frame_size': len(frame_bytes),
+                'timestamp': timestamp
+            })
+            # simple-websocket sends anything that isn't bytes as a text frame, so the
+            # message is assembled once from the JPEG view (one copy, then shared by all)
+            message = b''.join((struct.pack('<I', len(meta_bytes)), meta_bytes, frame_bytes))
+            
+            # Packed only when some client asked for MessagePack
+            msgpack_message = None
+            if msgpack_video_connections:
+                msgpack_message = msgpack.packb({
+                    'type': 'frame',
+                    'frame_id': frame_id,
+                    'detections': clean_detections,
+                    'fps': round(fps, 2),
+                    'ts': timestamp,
+                    'jpg': frame_bytes
+                }, use_bin_type=True)
+            
+            for frontend_ws in frontend_video_connections.snapshot():
+                try:
+                    if msgpack_message is not None and frontend_ws in msgpack_video_connections:
+                        frontend_ws.send(msgpack_message)
+                    else:
+                        frontend_ws.send(message)
+                except Exception as e:
+                    frontend_video_connections.discard(frontend_ws)
+                    msgpack_video_connections.discard(frontend_ws)
+                    print(f"⚠️ Removed dead frontend connection: {e}")
+            
+            # Same JPEG for MJPEG viewers, so each frame is encoded only once
+            with _mjpeg_condition:
+                _mjpeg_latest = (frame_id, frame_bytes)
+                _mjpeg_condition.notify_all()
+        except Exception as e:
+            print(f"❌ Error encoding frame: {e}")
+
+
+threading.Thread(target=_frame_encoder_worker, daemon=True, name='frame-encoder').start()
 
 
 def _broadcast_frame_to_frontend(frame, detections, fps):
-    """Broadcast frame and detections to all frontend connections"""
+    """Queue frame and detections for the encoder thread to send to all frontend connections"""
+    if not frontend_video_connections and not _mjpeg_clients:
+        return
+    
     clean_detections = []
     for det in detections:
         clean_detections.append({
@@ -1248,27 +1863,39 @@ def _broadcast_frame_to_frontend(frame, detections, fps):
             'freshness_score': det.get('freshness_score')
         })
     
-    # Encode frame to JPEG
-    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    frame_bytes = buffer.tobytes()
+    # Each camera read / proxy decode yields a new array, so no copy is needed
+    _put_latest(_frame_encode_queue, (frame, clean_detections, fps))
+
+
+@app.route('/stream.mjpeg')
+def stream_mjpeg():
+    """
+    MJPEG view of the video stream, playable directly in an <img> tag.
+    Frames only flow while a stream is running (local camera started or proxy connected);
+    detections stay on /ws/stream_video and can be matched by frame_meta.frame_id.
+    """
+    def generate():
+        global _mjpeg_clients
+        with _mjpeg_condition:
+            _mjpeg_clients += 1
+        last_frame_id = _mjpeg_latest[0]
+        try:
+            while True:
+                with _mjpeg_condition:
+                    _mjpeg_condition.wait_for(lambda: _mjpeg_latest[0] != last_frame_id, timeout=5)
+                    frame_id, jpeg = _mjpeg_latest
+                if frame_id == last_frame_id or jpeg is None:
+                    continue
+                last_frame_id = frame_id
+                yield (
+                    b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                    + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n'
+                )
+        finally:
+            with _mjpeg_condition:
+                _mjpeg_clients -= 1
     
-    # Broadcast to all frontend connections
-    num_connections = len(frontend_video_connections)
-    if num_connections > 0:
-        for frontend_ws in list(frontend_video_connections):
-            try:
-                metadata_json = json.dumps({
-                    'type': 'frame_meta',
-                    'detections': clean_detections,
-                    'fps': round(fps, 2),
-                    'frame_size': len(frame_bytes),
-                    'timestamp': datetime.utcnow().isoformat()
-                })
-                frontend_ws.send(metadata_json)
-                frontend_ws.send(frame_bytes)
-            except Exception as e:
-                frontend_video_connections.discard(frontend_ws)
-                print(f"⚠️ Removed dead frontend connection: {e}")
+    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
 def _get_thumbnail_for_fruit_type(processed_detections, fruit_type):
@@ -1310,8 +1937,9 @@ def _prepare_inventory_updates(current_class_counts, previous_class_counts, fres
                 ).start()
             
             # Prepare database update
-            if fruit_type in inventory_cache:
-                item_id, old_quantity = inventory_cache[fruit_type]
+            entry = _get_inventory_entry(inventory_cache, fruit_type)
+            if entry is not None:
+                item_id, old_quantity = entry
                 updates_to_process.append({
                     'type': 'update',
                     'item_id': item_id,
@@ -1321,7 +1949,10 @@ def _prepare_inventory_updates(current_class_counts, previous_class_counts, fres
                     'freshness_score': freshness_updates.get(fruit_type) if current_count > 0 else None,
                     'thumbnail_image': _get_thumbnail_for_fruit_type(processed_detections, fruit_type)
                 })
-                inventory_cache[fruit_type] = (item_id, current_count)
+                with _inventory_cache_lock:
+                    # Re-read the id: the DB writer may have filled in a placeholder
+                    item_id = inventory_cache.get(fruit_type, entry)[0]
+                    inventory_cache[fruit_type] = (item_id, current_count)
             elif current_count > 0:
                 updates_to_process.append({
                     'type': 'create',
@@ -1331,11 +1962,16 @@ def _prepare_inventory_updates(current_class_counts, previous_class_counts, fres
                     'freshness_score': freshness_updates.get(fruit_type),
                     'thumbnail_image': _get_thumbnail_for_fruit_type(processed_detections, fruit_type)
                 })
+                # Placeholder until the DB writer assigns an id, so later
+                # cycles queue updates instead of a second create
+                with _inventory_cache_lock:
+                    inventory_cache[fruit_type] = (None, current_count)
         
         # Handle freshness-only updates
         elif current_count > 0 and fruit_type in freshness_updates:
-            if fruit_type in inventory_cache:
-                item_id, _ = inventory_cache[fruit_type]
+            entry = _get_inventory_entry(inventory_cache, fruit_type)
+            if entry is not None:
+                item_id, _ = entry
                 updates_to_process.append({
                     'type': 'freshness_only',
                     'item_id': item_id,
@@ -1346,97 +1982,176 @@ def _prepare_inventory_updates(current_class_counts, previous_class_counts, fres
     return updates_to_process
 
 
+def _revert_inventory_updates(updates_to_process, inventory_cache):
+    """
+    Undo the cache changes made by _prepare_inventory_updates for updates that were
+    never written, so the next detection pass sees the same difference and retries them.
+    """
+    with _inventory_cache_lock:
+        for update in updates_to_process:
+            entry = inventory_cache.get(update['fruit_type'])
+            if entry is None:
+                continue
+            if update['type'] == 'update':
+                # Keep any id the DB writer has filled in since
+                inventory_cache[update['fruit_type']] = (entry[0], update['old_quantity'])
+            elif update['type'] == 'create' and entry[0] is None:
+                del inventory_cache[update['fruit_type']]
+
+
+def _submit_inventory_updates(updates_to_process, inventory_cache, processed_detections, default_store_id):
+    """
+    Hand inventory updates to the camera DB writer.
+    
+    Returns:
+        list: The updates that were queued (empty if there were none or the writer was backed up)
+    """
+    if not updates_to_process:
+        return []
+    if submit_camera_db_job(_apply_inventory_updates, updates_to_process, inventory_cache, processed_detections, default_store_id):
+        return updates_to_process
+    
+    print("⚠️ Camera DB writer is backed up; will retry inventory changes on a later pass")
+    _revert_inventory_updates(updates_to_process, inventory_cache)
+    return []
+
+
+def _resolve_item_id(update, inventory_cache):
+    """
+    Get the inventory id for an update, falling back to the cache when the
+    update was prepared before a queued create had been written.
+    """
+    if update.get('item_id') is not None:
+        return update['item_id']
+    return inventory_cache.get(update['fruit_type'], (None, 0))[0]
+
+
+def _new_camera_item(store_id, fruit_type, quantity, thumbnail_image, now):
+    """Build (but don't add) an inventory row for a fruit type first seen by the camera"""
+    random_suffix = random.randint(1000, 9999)
+    batch_number = f"BATCH-{now.strftime('%Y%m%d')}-{random_suffix}"
+    
+    thumbnail_path = None
+    if thumbnail_image is not None:
+        thumbnail_path = save_thumbnail(thumbnail_image, fruit_type)
+    
+    return FruitInventory(
+        store_id=store_id,
+        fruit_type=fruit_type,
+        quantity=quantity,
+        original_price=5.99,
+        current_price=5.99,
+        location_in_store="Camera Detection",
+        batch_number=batch_number,
+        thumbnail_path=thumbnail_path
+    )
+
+
 def _apply_inventory_updates(updates_to_process, inventory_cache, processed_detections, default_store_id=None):
-    """Apply inventory updates to database"""
+    """
+    Apply inventory updates to database.
+    Runs on the camera DB writer thread, which provides the app context.
+    
+    Quantity changes are written with one bulk_update_mappings call and new items
+    share a single flush, instead of one UPDATE/INSERT round trip per fruit type.
+    """
     if not updates_to_process:
         return
     
-    with app.app_context():
-        for update in updates_to_process:
-            if update['type'] == 'update':
-                db_item = db.session.get(FruitInventory, update['item_id'])
-                if db_item:
-                    db_item.quantity = update['new_quantity']
-                    db_item.updated_at = datetime.utcnow()
-                    notify_quantity_change(db_item, update['old_quantity'], update['new_quantity'])
-                    
-                    # Update thumbnail if provided
-                    if update.get('thumbnail_image') is not None:
-                        thumbnail_path = save_thumbnail(update['thumbnail_image'], update['fruit_type'])
-                        db_item.thumbnail_path = thumbnail_path
-                    
-                    if update.get('freshness_score') is not None:
-                        update_freshness_for_item(db_item.id, update['freshness_score'])
-                    
-                    inventory_cache[update['fruit_type']] = (db_item.id, update['new_quantity'])
-                else:
-                    # Item was deleted, create new one
-                    inventory_cache.pop(update['fruit_type'], None)
-                    thumbnail_image = update.get('thumbnail_image')
-                    if not thumbnail_image:
-                        thumbnail_image = _get_thumbnail_for_fruit_type(processed_detections, update['fruit_type'])
-                    
-                    timestamp = datetime.utcnow()
-                    random_suffix = random.randint(1000, 9999)
-                    batch_number = f"BATCH-{timestamp.strftime('%Y%m%d')}-{random_suffix}"
-                    
-                    thumbnail_path = None
-                    if thumbnail_image is not None:
-                        thumbnail_path = save_thumbnail(thumbnail_image, update['fruit_type'])
-                    
-                    new_item = FruitInventory(
-                        store_id=default_store_id or update.get('store_id'),
-                        fruit_type=update['fruit_type'],
-                        quantity=update['new_quantity'],
-                        original_price=5.99,
-                        current_price=5.99,
-                        location_in_store="Camera Detection",
-                        batch_number=batch_number,
-                        thumbnail_path=thumbnail_path
-                    )
-                    db.session.add(new_item)
-                    db.session.flush()
-                    inventory_cache[update['fruit_type']] = (new_item.id, update['new_quantity'])
-                    
-                    if update.get('freshness_score') is not None:
-                        update_freshness_for_item(new_item.id, update['freshness_score'])
-                    
-                    item_data = notify_quantity_change(new_item, 0, update['new_quantity'])
-                    broadcast_to_admins('inventory_added', item_data)
-            
-            elif update['type'] == 'create':
-                timestamp = datetime.utcnow()
-                random_suffix = random.randint(1000, 9999)
-                batch_number = f"BATCH-{timestamp.strftime('%Y%m%d')}-{random_suffix}"
-                
-                thumbnail_path = None
+    # Freshness scores are queued for the micro-batch writer after this commit,
+    # so newly created items are visible when the flush runs
+    queued_freshness = []
+    now = datetime.utcnow()
+    
+    # Load every item this batch updates in one IN query (freshness included,
+    # since the quantity-change payload reads it)
+    update_ids = {
+        _resolve_item_id(update, inventory_cache)
+        for update in updates_to_process if update['type'] == 'update'
+    }
+    update_ids.discard(None)
+    items_by_id = {}
+    if update_ids:
+        items_by_id = {
+            item.id: item
+            for item in FruitInventory.query.options(joinedload(FruitInventory.freshness)).filter(
+                FruitInventory.id.in_(update_ids)
+            )
+        }
+    
+    update_rows = []
+    new_items = []  # (item, quantity, freshness_score, replaced item id), flushed together below
+    
+    for update in updates_to_process:
+        if update['type'] == 'update':
+            item_id = _resolve_item_id(update, inventory_cache)
+            db_item = items_by_id.get(item_id)
+            if db_item:
+                row = {'id': db_item.id, 'quantity': update['new_quantity'], 'updated_at': now}
                 if update.get('thumbnail_image') is not None:
-                    thumbnail_path = save_thumbnail(update['thumbnail_image'], update['fruit_type'])
+                    row['thumbnail_path'] = save_thumbnail(update['thumbnail_image'], update['fruit_type'])
+                update_rows.append(row)
                 
-                new_item = FruitInventory(
-                    store_id=update['store_id'],
-                    fruit_type=update['fruit_type'],
-                    quantity=update['quantity'],
-                    original_price=5.99,
-                    current_price=5.99,
-                    location_in_store="Camera Detection",
-                    batch_number=batch_number,
-                    thumbnail_path=thumbnail_path
-                )
-                db.session.add(new_item)
-                db.session.flush()
-                inventory_cache[update['fruit_type']] = (new_item.id, update['quantity'])
+                # Mirror the row onto the loaded instance for the change payload without
+                # marking it dirty, so the flush doesn't emit its own UPDATE as well
+                for key, value in row.items():
+                    set_committed_value(db_item, key, value)
+                notify_quantity_change(db_item, update['old_quantity'], update['new_quantity'], commit=False, coalesce=True)
                 
                 if update.get('freshness_score') is not None:
-                    update_freshness_for_item(new_item.id, update['freshness_score'])
+                    queued_freshness.append((db_item.id, update['freshness_score']))
                 
-                item_data = notify_quantity_change(new_item, 0, update['quantity'])
-                broadcast_to_admins('inventory_added', item_data)
-            
-            elif update['type'] == 'freshness_only':
-                update_freshness_for_item(update['item_id'], update['freshness_score'])
+                _settle_inventory_id(inventory_cache, update['fruit_type'], None, db_item.id)
+            else:
+                # Item was deleted, create new one (its id replaces item_id in the cache below)
+                thumbnail_image = update.get('thumbnail_image')
+                if not thumbnail_image:
+                    thumbnail_image = _get_thumbnail_for_fruit_type(processed_detections, update['fruit_type'])
+                
+                new_item = _new_camera_item(
+                    default_store_id or update.get('store_id'), update['fruit_type'],
+                    update['new_quantity'], thumbnail_image, now
+                )
+                new_items.append((new_item, update['new_quantity'], update.get('freshness_score'), item_id))
         
-        db.session.commit()
+        elif update['type'] == 'create':
+            new_item = _new_camera_item(
+                update['store_id'], update['fruit_type'], update['quantity'], update.get('thumbnail_image'), now
+            )
+            new_items.append((new_item, update['quantity'], update.get('freshness_score'), None))
+        
+        elif update['type'] == 'freshness_only':
+            item_id = _resolve_item_id(update, inventory_cache)
+            if item_id is not None:
+                queued_freshness.append((item_id, update['freshness_score']))
+    
+    with write_transaction():
+        if update_rows:
+            db.session.bulk_update_mappings(FruitInventory, update_rows)
+        
+        if new_items:
+            # One flush inserts every new item as a batch and assigns their ids
+            db.session.add_all([item for item, _, _, _ in new_items])
+            db.session.flush()
+            for new_item, quantity, freshness_score, stale_id in new_items:
+                _settle_inventory_id(inventory_cache, new_item.fruit_type, stale_id, new_item.id)
+                
+                if freshness_score is not None:
+                    queued_freshness.append((new_item.id, freshness_score))
+                
+                item_data = notify_quantity_change(new_item, 0, quantity, commit=False, coalesce=True)
+                broadcast_to_admins_coalesced('inventory_added', item_data)
+    
+    for item_id, freshness_score in queued_freshness:
+        queue_freshness_update(item_id, freshness_score)
+
+
+# Longest a stop/disconnect waits for the local frame loop to exit before moving on
+FRAME_LOOP_STOP_TIMEOUT = 1.0
+
+# One-byte binary control ops accepted on the video websocket (JSON commands still work)
+VIDEO_OP_START = 0x01
+VIDEO_OP_STOP = 0x02
 
 
 @sock.route('/ws/stream_video')
@@ -1447,33 +2162,44 @@ def stream_video_websocket(ws):
     
     camera = None
     streaming = False
+    is_proxy_mode = CAMERA_MODE == 'proxy'
+    proxy_frame_queue = queue.Queue(maxsize=1)  # latest proxy frame awaiting processing
+    proxy_worker = None
+    use_msgpack = msgpack is not None and request.args.get('format') == 'msgpack'
+    # Set whenever no frame loop is running for this connection, so stop/disconnect
+    # can wait for the loop to exit instead of sleeping a fixed time
+    frame_loop_done = threading.Event()
+    frame_loop_done.set()
+    
+    def send_message(obj):
+        """Send a control message in the format this client negotiated"""
+        ws.send(msgpack.packb(obj, use_bin_type=True) if use_msgpack else json.dumps(obj))
     
     try:
         # Register this frontend connection for proxy broadcasting
         frontend_video_connections.add(ws)
-        
-        # Check if we're in proxy mode
-        is_proxy_mode = CAMERA_MODE == 'proxy'
+        if use_msgpack:
+            msgpack_video_connections.add(ws)
         
         # Send welcome message
-        ws.send(json.dumps({
+        send_message({
             'type': 'connected',
             'message': 'Connected to video stream endpoint',
-            'fresh_model_loaded': fresh_model is not None,
+            'fresh_model_loaded': _fresh_model_loaded(),
             'camera_mode': CAMERA_MODE,
             'proxy_mode': is_proxy_mode,
             'timestamp': datetime.utcnow().isoformat()
-        }))
+        })
         
         # Initialize shared state for proxy mode (if in proxy mode)
         global proxy_state_global
         if is_proxy_mode:
             _initialize_proxy_state()
             print("📹 Proxy mode: Waiting for frames from camera proxy...")
-            ws.send(json.dumps({
+            send_message({
                 'type': 'info',
                 'message': 'Proxy mode enabled - ready to receive frames'
-            }))
+            })
         
         def process_frame():
             """Process frames from camera and send to client"""
@@ -1483,46 +2209,39 @@ def stream_video_websocket(ws):
             
             # Track class counts
             previous_class_counts = {}  # {fruit_type: count}
-            current_class_counts = {}   # {fruit_type: count}
             
             # FPS calculation variables
-            frame_times = []
+            fps_window = FpsWindow(window_size=30)
             detection_delta = 0.25
             update_delta = 1
             last_updated_time = {}
             min_confidence = 0.6
             cached_detections = []
-            window_size = 30
             last_time = time.time()
-            last_detection_time = 0  # Track when detection last ran
+            last_detection_time = 0  # Track when a frame was last handed to detection
             
-            while streaming:
-                try:
-                    # Check if camera is still available
-                    if camera is None or not camera.isOpened():
-                        break
-                    
-                    frame_start_time = time.time()
-                    ret, frame = camera.read()
-                    if not ret:
-                        ws.send(json.dumps({
-                            'type': 'error',
-                            'message': 'Failed to capture frame'
-                        }))
+            # Detection (YOLO, freshness, inventory bookkeeping) runs on its own thread
+            # so capture and encoding keep going while a frame is being analysed.
+            # The inventory state below is only touched by that thread, apart from
+            # the DB writer filling in new item ids (see _settle_inventory_id).
+            detect_queue = queue.Queue(maxsize=1)
+            # Set while the detection thread has no frame in hand; the queue alone can't
+            # tell, since it is empty again as soon as the thread takes a frame
+            detector_idle = threading.Event()
+            detector_idle.set()
+            scene_gate = SceneChangeGate()
+            
+            def detection_worker():
+                """Run detection on handed-off frames and apply inventory updates"""
+                nonlocal cached_detections
+                while True:
+                    item = detect_queue.get()
+                    if item is None:
                         break
-                    
-                    # Check if we need to run detection (only if detection_delta seconds have passed)
-                    current_time = time.time()
-                    time_since_last_detection = current_time - last_detection_time
-                    
-                    if time_since_last_detection >= detection_delta:
-                        # Run detection and process
-                        result = detect(frame, allowed_classes=['apple', 'banana', 'orange'], save=False, verbose=False)
-                        processed_detections = _process_detections(frame, result['detections'], min_confidence)
-                        
-                        # Update cache and detection time
+                    frame, current_time = item
+                    try:
+                        processed_detections = _detect_and_process(frame, min_confidence)
                         cached_detections = processed_detections
-                        last_detection_time = current_time
                         
                         # Count classes and calculate freshness updates
                         current_class_counts = _count_detected_classes(processed_detections)
@@ -1535,7 +2254,7 @@ def stream_video_websocket(ws):
                             last_updated_time, current_time, update_delta
                         )
                         
-                        _apply_inventory_updates(updates_to_process, inventory_cache, processed_detections, default_store_id)
+                        updates_to_process = _submit_inventory_updates(updates_to_process, inventory_cache, processed_detections, default_store_id)
                         
                         # Update previous counts
                         for update in updates_to_process:
@@ -1545,48 +2264,94 @@ def stream_video_websocket(ws):
                                     previous_class_counts[fruit_type] = update.get('new_quantity', update.get('quantity', 0))
                                 elif update['type'] == 'freshness_only':
                                     previous_class_counts[fruit_type] = current_class_counts.get(fruit_type, 0)
-                    else:
-                        # Use cached detections
-                        processed_detections = cached_detections
+                    except Exception as e:
+                        warn_rate_limited(logger, 'camera-detector', "❌ Error in detection worker: %s", e)
+                    finally:
+                        detector_idle.set()
+            
+            threading.Thread(target=detection_worker, daemon=True, name='camera-detector').start()
+            
+            while streaming:
+                try:
+                    # Check if camera is still available
+                    if camera is None or not camera.isOpened():
+                        break
+                    
+                    # Stop capturing (and detecting) as soon as the controlling socket closes,
+                    # rather than when its receive loop eventually notices
+                    if not ws.connected:
+                        streaming = False
+                        break
+                    
+                    frame_start_time = time.time()
+                    ret, frame = read_shared_camera(camera)
+                    if not ret:
+                        send_message({
+                            'type': 'error',
+                            'message': 'Failed to capture frame'
+                        })
+                        break
+                    
+                    # Hand the frame to the detection thread at most every detection_delta
+                    # (only when it is idle and the scene changed); overlay the latest finished detections
+                    current_time = time.time()
+                    if current_time - last_detection_time >= detection_delta and detector_idle.is_set():
+                        last_detection_time = current_time
+                        if scene_gate.should_detect(frame, current_time):
+                            detector_idle.clear()
+                            detect_queue.put_nowait((frame, current_time))
+                    processed_detections = cached_detections
                     
                     # Calculate FPS
                     current_time = time.time()
                     frame_time = current_time - last_time
                     last_time = current_time
-                    frame_times.append(frame_time)
-                    fps = _calculate_fps(frame_times, window_size)
+                    fps = fps_window.add(frame_time)
                     
                     # Broadcast frame to frontend
                     _broadcast_frame_to_frontend(frame, processed_detections, fps)
                     
                     # Adaptive frame rate control
                     elapsed = time.time() - frame_start_time
-                    target_frame_time = 0.05  # 15 FPS
+                    target_frame_time = 0.05  # 20 FPS
                     if elapsed < target_frame_time:
                         time.sleep(target_frame_time - elapsed)
                     
                 except Exception as e:
                     if streaming:  # Only send error if still streaming
-                        ws.send(json.dumps({
-                            'type': 'error',
-                            'message': f'Error processing frame: {str(e)}'
-                        }))
+                        try:
+                            send_message({
+                                'type': 'error',
+                                'message': f'Error processing frame: {str(e)}'
+                            })
+                        except Exception:
+                            pass
+                    streaming = False
                     break
+            
+            # Every exit from the loop above is a break; stop the detection thread
+            _put_latest(detect_queue, None)
+        
+        def run_frame_loop():
+            """Thread target: run process_frame and signal when it has exited"""
+            try:
+                process_frame()
+            finally:
+                frame_loop_done.set()
         
         # Shared function to process proxy frames (used when in proxy mode)
-        def process_proxy_frame(frame_data_base64, state):
-            """Process frame from proxy and broadcast to frontend connections"""
+        def process_proxy_frame(frame_data, state):
+            """Process frame from proxy (JPEG bytes, or base64 str from older proxies) and broadcast to frontend connections"""
             import base64
             import numpy as np
             
             try:
-                # Decode base64 frame
-                frame_bytes = base64.b64decode(frame_data_base64)
+                frame_bytes = base64.b64decode(frame_data) if isinstance(frame_data, str) else frame_data
                 nparr = np.frombuffer(frame_bytes, np.uint8)
                 frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
                 
                 if frame is None:
-                    print("⚠️ Failed to decode frame from proxy")
+                    warn_rate_limited(logger, 'proxy-decode', "⚠️ Failed to decode frame from proxy")
                     return
                 
                 # Rate limit detection (only run every 0.25 seconds)
@@ -1595,14 +2360,18 @@ def stream_video_websocket(ws):
                 update_delta = 1.0
                 time_since_last_detection = current_time - state['last_detection_time']
                 
+                # Static scenes reuse the cached detections (see SceneChangeGate)
+                run_detection = False
                 if time_since_last_detection >= detection_delta:
+                    state['last_detection_time'] = current_time
+                    run_detection = state['scene_gate'].should_detect(frame, current_time)
+                
+                if run_detection:
                     # Run detection and process
-                    result = detect(frame, allowed_classes=['apple', 'banana', 'orange'], save=False, verbose=False)
-                    processed_detections = _process_detections(frame, result['detections'], min_confidence=0.6)
+                    processed_detections = _detect_and_process(frame, min_confidence=0.6)
                     
-                    # Update cache and detection time
+                    # Update cache
                     state['cached_detections'] = processed_detections
-                    state['last_detection_time'] = current_time
                     
                     # Count classes and calculate freshness updates
                     current_class_counts = _count_detected_classes(processed_detections)
@@ -1615,7 +2384,7 @@ def stream_video_websocket(ws):
                         state['last_updated_time'], current_time, update_delta
                     )
                     
-                    _apply_inventory_updates(updates_to_process, state['inventory_cache'], processed_detections, state['default_store_id'])
+                    updates_to_process = _submit_inventory_updates(updates_to_process, state['inventory_cache'], processed_detections, state['default_store_id'])
                     
                     # Update previous counts
                     for update in updates_to_process:
@@ -1633,16 +2402,75 @@ def stream_video_websocket(ws):
                 current_frame_time = time.time()
                 frame_time = current_frame_time - state['last_frame_time']
                 state['last_frame_time'] = current_frame_time
-                state['frame_times'].append(frame_time)
-                fps = _calculate_fps(state['frame_times'], state.get('fps_window_size', 30))
+                fps = state['fps_window'].add(frame_time)
                 
                 # Broadcast frame to frontend
                 _broadcast_frame_to_frontend(frame, processed_detections, fps)
                 
             except Exception as e:
-                print(f"❌ Error processing proxy frame: {e}")
-                import traceback
-                traceback.print_exc()
+                warn_rate_limited(logger, 'proxy-frame', "❌ Error processing proxy frame: %s", e)
+        
+        # Proxy frames are handled by one long-lived worker per proxy connection.
+        # The queue holds a single frame: if the worker is busy, the pending frame
+        # is replaced so processing stays on the newest frame instead of backlogging.
+        def proxy_frame_worker():
+            """Process proxy frames one at a time until the connection closes"""
+            while True:
+                frame_data = proxy_frame_queue.get()
+                if frame_data is None:
+                    break
+                if proxy_state_global:
+                    process_proxy_frame(frame_data, proxy_state_global)
+        
+        def handle_start():
+            """Open (or reuse) the shared camera and start the frame loop"""
+            nonlocal camera, streaming
+            if camera is not None:
+                send_message({
+                    'type': 'error',
+                    'message': 'Camera already started'
+                })
+                return
+            
+            # Reuse the shared camera if another stream (or a recent one) opened it
+            camera = acquire_shared_camera()
+            if camera is None:
+                send_message({
+                    'type': 'error',
+                    'message': 'Failed to open camera'
+                })
+                return
+            
+            streaming = True
+            send_message({
+                'type': 'started',
+                'message': 'Camera started, streaming frames'
+            })
+            
+            # Start processing frames in a separate thread
+            frame_loop_done.clear()
+            thread = threading.Thread(target=run_frame_loop, daemon=True)
+            thread.start()
+        
+        def handle_stop():
+            """Stop the frame loop and drop our camera reference"""
+            nonlocal camera, streaming
+            streaming = False
+            # Let the frame loop finish its current iteration (bounded)
+            frame_loop_done.wait(FRAME_LOOP_STOP_TIMEOUT)
+            if camera is not None:
+                release_shared_camera()
+                camera = None
+            send_message({
+                'type': 'stopped',
+                'message': 'Camera stopped'
+            })
+        
+        # Single-byte binary commands skip message decoding entirely
+        command_ops = {
+            VIDEO_OP_START: handle_start,
+            VIDEO_OP_STOP: handle_stop,
+        }
         
         # Listen for commands from client (or frames from proxy if in proxy mode)
         while True:
@@ -1650,107 +2478,104 @@ def stream_video_websocket(ws):
             if not data:
                 continue
             
+            # One-byte control op from a frontend (local mode only)
+            if isinstance(data, (bytes, bytearray)) and len(data) == 1:
+                handler = None if is_proxy_mode else command_ops.get(data[0])
+                if handler is not None:
+                    handler()
+                else:
+                    send_message({
+                        'type': 'error',
+                        'message': 'Unknown command'
+                    })
+                continue
+            
+            # Binary proxy frame: <uint32 LE meta length><meta JSON><JPEG>
+            # (MessagePack clients send their commands as binary messages instead)
+            if isinstance(data, (bytes, bytearray)) and not use_msgpack:
+                if is_proxy_mode and proxy_state_global and len(data) > 4:
+                    (meta_len,) = struct.unpack_from('<I', data)
+                    jpeg = memoryview(data)[4 + meta_len:]
+                    if jpeg:
+                        if proxy_worker is None:
+                            proxy_worker = threading.Thread(
+                                target=proxy_frame_worker, daemon=True, name='proxy-frame-worker'
+                            )
+                            proxy_worker.start()
+                        _put_latest(proxy_frame_queue, jpeg)
+                continue
+            
+            try:
+                if isinstance(data, (bytes, bytearray)):
+                    message = msgpack.unpackb(data, raw=False)
+                else:
+                    message = json.loads(data)
+            except _MSGPACK_DECODE_ERRORS:
+                send_message({
+                    'type': 'error',
+                    'message': 'Invalid message format'
+                })
+                continue
+            
             try:
-                message = json.loads(data)
                 msg_type = message.get('type')
                 command = message.get('command')
                 
-                # Handle proxy frames (when in proxy mode)
+                # Handle JSON/base64 proxy frames from older proxies (when in proxy mode)
                 if is_proxy_mode and msg_type == 'frame':
                     frame_data = message.get('data')
                     if frame_data and proxy_state_global:
-                        threading.Thread(
-                            target=process_proxy_frame,
-                            args=(frame_data, proxy_state_global),
-                            daemon=True
-                        ).start()
+                        if proxy_worker is None:
+                            proxy_worker = threading.Thread(
+                                target=proxy_frame_worker, daemon=True, name='proxy-frame-worker'
+                            )
+                            proxy_worker.start()
+                        _put_latest(proxy_frame_queue, frame_data)
                     continue
                 
                 # Handle proxy connection acknowledgment
                 if is_proxy_mode and msg_type == 'proxy_connected':
-                    ws.send(json.dumps({
+                    send_message({
                         'type': 'ack',
                         'message': 'Proxy connection acknowledged'
-                    }))
+                    })
                     continue
                 
                 # Handle ping/pong
                 if msg_type == 'ping':
-                    ws.send(json.dumps({'type': 'pong'}))
+                    send_message({'type': 'pong'})
                     continue
                 
                 # Handle frontend commands (local mode only)
                 if not is_proxy_mode and command == 'start':
-                    if camera is not None:
-                        ws.send(json.dumps({
-                            'type': 'error',
-                            'message': 'Camera already started'
-                        }))
-                        continue
-                    
-                    # Open camera - use highest available camera index (prefers USB cameras)
-                    camera_index = get_best_camera_index()
-                    camera = cv2.VideoCapture(camera_index)
-                    if not camera.isOpened():
-                        ws.send(json.dumps({
-                            'type': 'error',
-                            'message': 'Failed to open camera'
-                        }))
-                        continue
-                    
-                    streaming = True
-                    ws.send(json.dumps({
-                        'type': 'started',
-                        'message': 'Camera started, streaming frames'
-                    }))
-                    
-                    # Start processing frames in a separate thread
-                    thread = threading.Thread(target=process_frame, daemon=True)
-                    thread.start()
-                    
+                    handle_start()
                 elif command == 'stop':
-                    streaming = False
-                    # Give the thread a moment to finish its current iteration
-                    time.sleep(0.1)
-                    if camera is not None:
-                        try:
-                            camera.release()
-                        except Exception:
-                            pass
-                        camera = None
-                    ws.send(json.dumps({
-                        'type': 'stopped',
-                        'message': 'Camera stopped'
-                    }))
+                    handle_stop()
             
-            except json.JSONDecodeError:
-                ws.send(json.dumps({
-                    'type': 'error',
-                    'message': 'Invalid JSON format'
-                }))
             except Exception as e:
-                ws.send(json.dumps({
+                send_message({
                     'type': 'error',
                     'message': f'Unexpected error: {str(e)}'
-                }))
+                })
     
     except Exception as e:
-        print(f"Video stream WebSocket error: {e}")
+        logger.warning("Video stream WebSocket error: %s", e)
     finally:
         # Unregister frontend connection
         frontend_video_connections.discard(ws)
+        msgpack_video_connections.discard(ws)
         
-        # Properly cleanup: stop streaming first, wait for thread, then release camera
+        # Stop the proxy frame worker, if one was started
+        if proxy_worker is not None:
+            _put_latest(proxy_frame_queue, None)
+        
+        # Properly cleanup: stop streaming first, wait for thread, then drop our camera reference
         streaming = False
-        # Give the processing thread time to exit its loop
-        time.sleep(0.2)
+        frame_loop_done.wait(FRAME_LOOP_STOP_TIMEOUT)
         if camera is not None:
-            try:
-                camera.release()
-            except Exception:
-                pass
+            release_shared_camera()
             camera = None
-        print("Video stream WebSocket disconnected")
+        logger.info("Video stream WebSocket disconnected")
 
 
 # ============ Error Handlers ============
@@ -1816,8 +2641,11 @@ if __name__ == '__main__':
     print(f"🏥 Health Check: http://localhost:{PORT}/health")
     print("="*50 + "\n")
     
+    # FLASK_DEBUG=false also turns off the reloader, whose watcher process would
+    # otherwise import this module (threads, camera, models) a second time
     app.run(
         host='0.0.0.0',
         port=PORT,
-        debug=True
+        debug=os.getenv('FLASK_DEBUG', 'true').lower() == 'true',
+        threaded=True
     )
@@ -60,6 +60,11 @@ class FruitInventory(db.Model):
     waste_logs = db.relationship('WasteLog', back_populates='inventory', cascade='all, delete-orphan')
     quantity_changes = db.relationship('QuantityChangeLog', back_populates='inventory', cascade='all, delete-orphan')
     
+    # Matches the store_id / fruit_type filters on inventory list queries
+    __table_args__ = (
+        db.Index('ix_inventory_store_fruit', 'store_id', 'fruit_type'),
+    )
+    
     def to_dict(self, include_freshness=True):
         data = {
             'id': self.id,
@@ -85,6 +90,18 @@ class FruitInventory(db.Model):
             
         return data
     
+    def to_dict_list(self):
+        """Lightweight dict for list views; only touches the columns loaded by summary queries"""
+        return {
+            'id': self.id,
+            'store_id': self.store_id,
+            'fruit_type': self.fruit_type,
+            'quantity': self.quantity,
+            'original_price': self.original_price,
+            'current_price': self.current_price,
+            'thumbnail_path': self.thumbnail_path
+        }
+    
     def get_actual_freshness_scores(self):
         """Parse actual_freshness_scores JSON"""
         if self.actual_freshness_scores:
@@ -112,6 +129,33 @@ class FruitInventory(db.Model):
         return round(sum(scores) / len(scores), 2)
 
 
+def _discount_for_score(freshness):
+    """
+    Discount formula for a clamped freshness score (0-1.0).
+    discount = max_discount * (1 - freshness^power)
+    """
+    # Maximum discount at 0 freshness (75%)
+    max_discount = 75.0
+    # Power factor controls the curve shape (higher = more aggressive discounting at lower freshness)
+    # Using 1.5 for a moderate curve that discounts more aggressively as freshness decreases
+    power = 1.5
+    
+    # Calculate discount: starts at 0% for 1.0 freshness, increases as freshness decreases
+    # Using inverse relationship: discount increases as freshness decreases
+    discount = max_discount * (1 - (freshness ** power))
+    
+    return round(discount, 2)
+
+
+# Precomputed discounts for every score on a 0.0001 grid
+DISCOUNT_LUT_STEPS = 10000
+_DISCOUNT_LUT = [_discount_for_score(i / DISCOUNT_LUT_STEPS) for i in range(DISCOUNT_LUT_STEPS + 1)]
+
+
+# Statuses that need staff attention; queried as a set, so keep a single definition
+CRITICAL_STATUSES = ('ripe', 'clearance')
+
+
 class FreshnessStatus(db.Model):
     """AI-generated freshness monitoring for each inventory item"""
     __tablename__ = 'freshness_status'
@@ -122,7 +166,7 @@ class FreshnessStatus(db.Model):
     predicted_expiry_date = db.Column(db.DateTime)
     confidence_level = db.Column(db.Float)  # 0-1 scale
     discount_percentage = db.Column(db.Float, default=0)
-    status = db.Column(db.String(50), default='fresh')  # fresh, ripe, clearance
+    status = db.Column(db.String(50), default='fresh', index=True)  # fresh, ripe, clearance
     last_checked = db.Column(db.DateTime, default=datetime.utcnow)
     image_url = db.Column(db.String(500))
     notes = db.Column(db.Text)
@@ -153,21 +197,17 @@ class FreshnessStatus(db.Model):
         - freshness_score = 1.0 → discount = 0%
         - freshness_score = 0 → discount = max_discount%
         Note: freshness_score is 0-1.0 scale (not 0-100)
-        """
-        # Maximum discount at 0 freshness (75%)
-        max_discount = 75.0
-        # Power factor controls the curve shape (higher = more aggressive discounting at lower freshness)
-        # Using 1.5 for a moderate curve that discounts more aggressively as freshness decreases
-        power = 1.5
         
+        Scores on the 0.0001 grid (camera scores are rounded to 4 decimals) are
+        served from a precomputed table; any other score uses the formula.
+        """
         # Clamp freshness_score between 0 and 1.0
         freshness = max(0.0, min(1.0, self.freshness_score))
         
-        # Calculate discount: starts at 0% for 1.0 freshness, increases as freshness decreases
-        # Using inverse relationship: discount increases as freshness decreases
-        discount = max_discount * (1 - (freshness ** power))
-        
-        return round(discount, 2)
+        index = int(round(freshness * DISCOUNT_LUT_STEPS))
+        if index / DISCOUNT_LUT_STEPS == freshness:
+            return _DISCOUNT_LUT[index]
+        return _discount_for_score(freshness)
     
     def update_status(self):
         """Update status based on freshness score (0-1.0 scale)"""
@@ -195,6 +235,7 @@ class Customer(db.Model):
     # Relationships
     purchases = db.relationship('PurchaseHistory', back_populates='customer', cascade='all, delete-orphan')
     recommendations = db.relationship('Recommendation', back_populates='customer', cascade='all, delete-orphan')
+    favorites = db.relationship('CustomerFavorite', back_populates='customer', cascade='all, delete-orphan')
     
     def to_dict(self, include_preferences=True):
         data = {
@@ -215,6 +256,15 @@ class Customer(db.Model):
         
         return data
     
+    def to_dict_list(self):
+        """Lightweight dict for list views; only touches the columns loaded by summary queries"""
+        return {
+            'id': self.id,
+            'knot_customer_id': self.knot_customer_id,
+            'name': self.name,
+            'email': self.email
+        }
+    
     def get_preferences(self):
         """Parse preferences JSON"""
         if self.preferences:
@@ -225,8 +275,46 @@ class Customer(db.Model):
         return {}
     
     def set_preferences(self, prefs_dict):
-        """Set preferences from dictionary"""
+        """Set preferences from dictionary and sync the favorites table"""
         self.preferences = json.dumps(prefs_dict)
+        self.sync_favorites(prefs_dict.get('favorite_fruits', []))
+    
+    def sync_favorites(self, favorite_fruits):
+        """Make the CustomerFavorite rows match the given list of fruit types"""
+        wanted = set(favorite_fruits or [])
+        kept = [fav for fav in self.favorites if fav.fruit_type in wanted]
+        existing = {fav.fruit_type for fav in kept}
+        self.favorites = kept + [
+            CustomerFavorite(fruit_type=fruit_type)
+            for fruit_type in sorted(wanted - existing)
+        ]
+
+
+class CustomerFavorite(db.Model):
+    """
+    Normalized favorite fruits per customer.
+    Mirrors preferences['favorite_fruits'] so matching can be done in SQL;
+    the preferences JSON is still what the UI displays.
+    """
+    __tablename__ = 'customer_favorites'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    fruit_type = db.Column(db.String(100), nullable=False, index=True)
+    
+    # Relationships
+    customer = db.relationship('Customer', back_populates='favorites')
+    
+    __table_args__ = (
+        db.UniqueConstraint('customer_id', 'fruit_type', name='_customer_fruit_uc'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'fruit_type': self.fruit_type
+        }
 
 
 class PurchaseHistory(db.Model):
@@ -277,6 +365,11 @@ class Recommendation(db.Model):
     customer = db.relationship('Customer', back_populates='recommendations')
     inventory = db.relationship('FruitInventory', back_populates='recommendations')
     
+    # Serves "unpurchased recommendations for a customer, best first" as one index range scan
+    __table_args__ = (
+        db.Index('ix_rec_customer_unpurchased_prio', customer_id, purchased, priority_score.desc()),
+    )
+    
     def to_dict(self):
         data = {
             'id': self.id,
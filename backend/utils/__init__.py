@@ -3,14 +3,18 @@
 from .helpers import (
     broadcast_to_admins,
     notify_customer,
+    notify_customers,
     notify_quantity_change,
-    update_freshness_for_item
+    update_freshness_for_item,
+    queue_freshness_update
 )
 
 __all__ = [
     'broadcast_to_admins',
     'notify_customer',
+    'notify_customers',
     'notify_quantity_change',
-    'update_freshness_for_item'
+    'update_freshness_for_item',
+    'queue_freshness_update'
 ]
 
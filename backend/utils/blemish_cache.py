@@ -0,0 +1,89 @@
+"""
+Content-addressed cache for blemish detection results.
+Keyed by the SHA-1 of the image bytes, so re-analysing the same crop (after its
+metadata file is lost, or when saved again under another name) skips the Gemini call.
+The cache is persisted next to the detection images and reloaded on startup.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from utils.image_storage import DETECTION_IMAGES_DIR
+
+
+BLEMISH_CACHE_PATH = DETECTION_IMAGES_DIR / ".blemish_cache.json"
+BLEMISH_CACHE_SIZE = 4096
+
+_cache = OrderedDict()  # {content_hash: blemish metadata dict}, oldest first
+_cache_lock = threading.Lock()
+_save_lock = threading.Lock()  # serializes disk writes so lookups don't wait on file I/O
+_loaded = False
+
+
+def image_content_hash(image_path) -> str:
+    """SHA-1 hex digest of an image file's bytes"""
+    with open(image_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _load():
+    """Read the persisted cache once (caller holds the lock)"""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        with open(BLEMISH_CACHE_PATH, 'r') as f:
+            _cache.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Could not load blemish cache: {e}")
+
+
+def _save():
+    """Write a snapshot of the cache to disk atomically (caller must not hold _cache_lock)"""
+    with _save_lock:
+        # Snapshot after taking the save lock, so a later save never writes older contents
+        with _cache_lock:
+            snapshot = dict(_cache)
+        try:
+            BLEMISH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = BLEMISH_CACHE_PATH.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            tmp_path.replace(BLEMISH_CACHE_PATH)
+        except Exception as e:
+            print(f"⚠️ Could not save blemish cache: {e}")
+
+
+def get_cached_blemishes(content_hash: str) -> Optional[dict]:
+    """
+    Look up blemish results for an image hash.
+
+    Returns:
+        The cached blemish metadata dict, or None on a miss
+    """
+    with _cache_lock:
+        _load()
+        result = _cache.get(content_hash)
+        if result is not None:
+            _cache.move_to_end(content_hash)
+        return result
+
+
+def cache_blemishes(content_hash: str, blemishes: dict):
+    """
+    Store blemish results for an image hash, evicting the least recently used
+    entry when full. Written through to disk; inserts only follow Gemini calls.
+    """
+    with _cache_lock:
+        _load()
+        _cache[content_hash] = blemishes
+        _cache.move_to_end(content_hash)
+        while len(_cache) > BLEMISH_CACHE_SIZE:
+            _cache.popitem(last=False)
+    _save()
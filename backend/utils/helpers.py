@@ -2,56 +2,530 @@
 
 import json
 import os
+import queue
 import threading
 import time
 from datetime import datetime
-from models import db, FruitInventory, FreshnessStatus, Customer, Recommendation, QuantityChangeLog
+from itertools import chain
+from flask import Response, stream_with_context
+from sqlalchemy import cast, event, func, insert, select, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, contains_eager, joinedload, object_session
+from models import db, FruitInventory, FreshnessStatus, Customer, CustomerFavorite, Recommendation, QuantityChangeLog, CRITICAL_STATUSES
+from database import commit_session, write_transaction
+from utils.response_cache import TTLCache
 
 from xai_sdk import Client
 from xai_sdk.chat import user, system
 
+# orjson is a much faster encoder for the broadcast payloads; fall back to stdlib json
+try:
+    import orjson
+    
+    def json_dumps(obj):
+        """Serialize obj to a JSON str using orjson"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def json_dumps_bytes(obj):
+        """Serialize obj to UTF-8 JSON bytes using orjson (no intermediate str)"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    def json_dumps(obj):
+        """Serialize obj to a JSON str using the stdlib encoder"""
+        return json.dumps(obj)
+    
+    def json_dumps_bytes(obj):
+        """Serialize obj to UTF-8 JSON bytes using the stdlib encoder"""
+        return json.dumps(obj).encode('utf-8')
+
+
+def sse_event(obj):
+    """Frame obj as a Server-Sent Events data message (bytes)"""
+    return b'data: ' + json_dumps_bytes(obj) + b'\n\n'
+
+
+def stream_json_list(list_key, rows, serialize, head=None):
+    """
+    Stream a {..head, list_key: [...], "count": N} JSON body without materializing the list.
+    
+    Args:
+        list_key: Key of the streamed array
+        rows: Iterable of rows (e.g. a query with yield_per)
+        serialize: Callable turning one row into a JSON-serializable dict
+        head: Optional dict of fields emitted before the array
+    
+    The first row is fetched before the response is built, so query errors
+    raise here and the caller can still return an error status.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    
+    def generate():
+        prefix = json_dumps(head)[1:-1] + ',' if head else ''
+        yield '{' + prefix + json_dumps(list_key) + ':['
+        count = 0
+        try:
+            for row in chain([first], rows) if first is not None else ():
+                yield (',' if count else '') + json_dumps(serialize(row))
+                count += 1
+        except Exception as e:
+            # Headers are already sent; abort the chunked response so the
+            # client sees a failed transfer rather than a short list
+            print(f"❌ Error streaming {list_key}: {e}")
+            raise
+        yield f'],"count":{count}}}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+class ConnectionSet:
+    """
+    Copy-on-write set of websocket connections.
+    Writers swap in a new frozenset under a lock; broadcasters read the current
+    snapshot without locking and can iterate it while sockets come and go.
+    """
+    
+    def __init__(self):
+        self._sockets = frozenset()
+        self._lock = threading.Lock()
+    
+    def add(self, ws):
+        with self._lock:
+            self._sockets = self._sockets | {ws}
+    
+    def discard(self, ws):
+        self.discard_many((ws,))
+    
+    def discard_many(self, sockets):
+        """Remove several sockets with one swap (e.g. the dead ones after a broadcast)"""
+        with self._lock:
+            self._sockets = self._sockets.difference(sockets)
+    
+    def snapshot(self):
+        """Current members as an immutable frozenset"""
+        return self._sockets
+    
+    def __len__(self):
+        return len(self._sockets)
+    
+    def __iter__(self):
+        return iter(self._sockets)
+    
+    def __contains__(self, ws):
+        return ws in self._sockets
+
+
 # These will be set by the app initialization
 # Note: These are module-level variables that will be shared across imports
-admin_connections = set()
+admin_connections = ConnectionSet()
 customer_connections = {}  # {customer_id: ws}
+# Guards the customer registry: websocket threads register/unregister while
+# request threads and the broadcast worker look up and prune sockets
+connections_lock = threading.RLock()
+
+# Flask app used by background threads (set via set_app_instance)
+_app_instance = None
 
 # Rate limiting for AI recommendations
 _last_ai_call_time = 0
 _ai_call_lock = threading.Lock()
 AI_RECOMMENDATION_INTERVAL = 10  # Minimum seconds between AI calls
 
+# Websocket sends are handed to a background worker so HTTP handlers don't
+# wait on slow sockets. Set ASYNC_BROADCAST=false to send inline instead.
+ASYNC_BROADCAST = os.getenv('ASYNC_BROADCAST', 'true').lower() == 'true'
+BROADCAST_QUEUE_SIZE = 10_000
+_broadcast_queue = queue.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+# Sockets sent to before the sending thread yields, so request threads get the
+# GIL between groups when many dashboards are connected
+BROADCAST_SEND_BATCH = 50
+
+
+def _broadcast_frame(connections, payload):
+    """
+    Send one pre-serialized payload to every socket in connections.
+    The payload is encoded once by the caller and reused for each socket.
+    
+    Returns:
+        list: Sockets whose send failed (caller prunes them in one go)
+    """
+    dead = []
+    for i, ws in enumerate(connections.snapshot()):
+        if i and i % BROADCAST_SEND_BATCH == 0:
+            time.sleep(0)  # yield to other threads between groups
+        try:
+            ws.send(payload)
+        except Exception:
+            dead.append(ws)
+    return dead
+
+
+def _send_to_admins(message):
+    """Send a serialized message to every admin socket, pruning dead ones"""
+    dead = _broadcast_frame(admin_connections, message)
+    if dead:
+        admin_connections.discard_many(dead)
+
+
+def _send_to_customer(customer_id, message):
+    """Send a serialized message to one customer socket, if connected"""
+    with connections_lock:
+        ws = customer_connections.get(customer_id)
+    if ws is None:
+        return
+    try:
+        ws.send(message)
+    except Exception:
+        remove_customer_connection(customer_id, ws)
+
+
+def _send_to_customers(messages):
+    """Send serialized messages to several customers, pruning sockets that fail"""
+    for customer_id, ws, message in messages:
+        try:
+            ws.send(message)
+        except Exception:
+            remove_customer_connection(customer_id, ws)
+
+
+def add_admin_connection(ws):
+    """Register an admin dashboard socket"""
+    admin_connections.add(ws)
+
+
+def remove_admin_connection(ws):
+    """Unregister an admin dashboard socket (no-op if already gone)"""
+    admin_connections.discard(ws)
+
+
+def add_customer_connection(customer_id, ws):
+    """Register (or replace) the socket for a customer"""
+    with connections_lock:
+        customer_connections[customer_id] = ws
+
+
+def remove_customer_connection(customer_id, ws=None):
+    """
+    Unregister a customer's socket.
+    When ws is given, only remove it if it is still the registered socket,
+    so a stale socket closing doesn't drop the customer's newer connection.
+    """
+    with connections_lock:
+        if ws is None or customer_connections.get(customer_id) is ws:
+            customer_connections.pop(customer_id, None)
+
+
+def _broadcast_worker():
+    """Drain the broadcast queue and perform the actual socket sends"""
+    while True:
+        send_fn, args = _broadcast_queue.get()
+        try:
+            send_fn(*args)
+        except Exception as e:
+            print(f"❌ Error in broadcast worker: {e}")
+
+
+def _enqueue_send(send_fn, *args):
+    """
+    Queue a send for the broadcast worker (or run it inline if disabled).
+    When the queue is full the oldest pending send is dropped.
+    """
+    if not ASYNC_BROADCAST:
+        send_fn(*args)
+        return
+    
+    while True:
+        try:
+            _broadcast_queue.put_nowait((send_fn, args))
+            return
+        except queue.Full:
+            try:
+                _broadcast_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+if ASYNC_BROADCAST:
+    threading.Thread(target=_broadcast_worker, daemon=True, name='broadcast-worker').start()
+
+
+# With several server processes, an admin or customer socket only lives in one of them.
+# Setting REDIS_URL publishes their messages to Redis channels instead; every process
+# relays what it receives to its own sockets, so each client sees every event once.
+REDIS_URL = os.getenv('REDIS_URL')
+ADMIN_EVENTS_CHANNEL = 'suscart:admin_events'
+CUSTOMER_EVENTS_CHANNEL = 'suscart:customer_events'  # messages are '<customer_id>:<json>'
+_redis_client = None
+if REDIS_URL:
+    try:
+        import redis
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    except ImportError:
+        print("⚠️ REDIS_URL is set but redis is not installed; admin broadcasts stay local")
+
+
+def _publish_admin_message(message):
+    """Deliver a serialized admin message to admin sockets in every process (or just this one)"""
+    if _redis_client is not None:
+        try:
+            _redis_client.publish(ADMIN_EVENTS_CHANNEL, message)
+            return
+        except Exception as e:
+            print(f"⚠️ Redis publish failed, sending locally: {e}")
+    _enqueue_send(_send_to_admins, message)
+
+
+def _publish_customer_messages(messages):
+    """
+    Publish serialized customer messages for whichever process holds each socket.
+    
+    Args:
+        messages: Iterable of (customer_id, message) pairs
+    
+    Returns:
+        bool: False if Redis isn't configured or the publish failed (send locally instead)
+    """
+    if _redis_client is None:
+        return False
+    try:
+        pipe = _redis_client.pipeline(transaction=False)
+        for customer_id, message in messages:
+            pipe.publish(CUSTOMER_EVENTS_CHANNEL, f'{customer_id}:{message}')
+        pipe.execute()
+        return True
+    except Exception as e:
+        print(f"⚠️ Redis publish failed, sending locally: {e}")
+        return False
+
+
+def _redis_relay_worker():
+    """Forward admin and customer messages published by any process to this process's sockets"""
+    customer_channel = CUSTOMER_EVENTS_CHANNEL.encode('utf-8')
+    while True:
+        try:
+            pubsub = _redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(ADMIN_EVENTS_CHANNEL, CUSTOMER_EVENTS_CHANNEL)
+            for item in pubsub.listen():
+                if item.get('type') != 'message':
+                    continue
+                # Clients expect text frames
+                data = item['data'].decode('utf-8')
+                if item['channel'] == customer_channel:
+                    customer_id, _, message = data.partition(':')
+                    # No-op unless the customer is connected to this process
+                    _enqueue_send(_send_to_customer, int(customer_id), message)
+                else:
+                    _enqueue_send(_send_to_admins, data)
+        except Exception as e:
+            print(f"❌ Redis relay lost connection, retrying: {e}")
+            time.sleep(1)
+
+
+if _redis_client is not None:
+    threading.Thread(target=_redis_relay_worker, daemon=True, name='redis-relay').start()
+
+
+# Counts behind the admin get_stats action. Cached for STATS_CACHE_TTL seconds (in Redis
+# when configured, so every process shares them) and dropped once a commit changes them.
+STATS_CACHE_TTL = 5
+_STATS_KEYS = ('suscart:stats:inventory_count', 'suscart:stats:critical_count')
+_local_stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL)
+
+# Both counts in one round trip. Built once: the statement is constant, so each miss
+# skips construction and hits SQLAlchemy's compiled-SQL cache directly (and plain
+# COUNTs avoid Query.count()'s SELECT count(*) FROM (SELECT <every column> ...) wrapper).
+_ADMIN_STATS_STMT = select(
+    select(func.count(FruitInventory.id)).scalar_subquery(),
+    select(func.count(FreshnessStatus.id)).where(
+        FreshnessStatus.status.in_(CRITICAL_STATUSES)
+    ).scalar_subquery()
+)
+
+
+def get_admin_stats():
+    """
+    Get the inventory and critical item counts for the admin dashboard.
+    
+    Returns:
+        dict: {'inventory_count': int, 'critical_count': int}
+    """
+    if _redis_client is not None:
+        try:
+            inventory_count, critical_count = _redis_client.mget(_STATS_KEYS)
+            if inventory_count is not None and critical_count is not None:
+                return {'inventory_count': int(inventory_count), 'critical_count': int(critical_count)}
+        except Exception as e:
+            print(f"⚠️ Redis stats lookup failed, querying the database: {e}")
+    else:
+        stats = _local_stats_cache.get('stats')
+        if stats is not None:
+            return stats
+    
+    inventory_count, critical_count = db.session.execute(_ADMIN_STATS_STMT).one()
+    stats = {'inventory_count': inventory_count, 'critical_count': critical_count}
+    if _redis_client is not None:
+        try:
+            pipe = _redis_client.pipeline()
+            pipe.setex(_STATS_KEYS[0], STATS_CACHE_TTL, stats['inventory_count'])
+            pipe.setex(_STATS_KEYS[1], STATS_CACHE_TTL, stats['critical_count'])
+            pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Could not cache stats in Redis: {e}")
+    else:
+        _local_stats_cache.set('stats', stats)
+    return stats
+
+
+def invalidate_admin_stats():
+    """Drop the cached admin stats so the next get_stats recounts"""
+    if _redis_client is not None:
+        try:
+            _redis_client.delete(*_STATS_KEYS)
+        except Exception as e:
+            print(f"⚠️ Could not clear cached stats in Redis: {e}")
+    else:
+        _local_stats_cache.pop('stats')
+
+
+def _mark_stats_dirty(mapper, connection, target):
+    """Mapper hook: remember that this session's transaction changes the admin stats"""
+    session = object_session(target)
+    if session is not None:
+        session.info['admin_stats_dirty'] = True
+
+
+for _model, _events in ((FruitInventory, ('after_insert', 'after_delete')),
+                        (FreshnessStatus, ('after_insert', 'after_update', 'after_delete'))):
+    for _event_name in _events:
+        event.listen(_model, _event_name, _mark_stats_dirty)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_stats_after_commit(session):
+    """Drop the cached stats once a transaction that changed them is committed"""
+    if session.info.pop('admin_stats_dirty', False):
+        invalidate_admin_stats()
+
 
 def broadcast_to_admins(event_type, data):
     """Broadcast message to all connected admin dashboards"""
-    message = json.dumps({
+    message = json_dumps({
         'type': event_type,
         'data': data,
         'timestamp': datetime.utcnow().isoformat()
     })
     
-    for ws in admin_connections.copy():
+    _publish_admin_message(message)
+
+
+# High-rate admin events (camera-driven inventory changes) are collected and sent as
+# one 'batch' message every ADMIN_COALESCE_INTERVAL, so a burst of detections costs
+# one send per admin socket instead of one per event.
+ADMIN_COALESCE_INTERVAL = 0.1  # seconds
+_coalesced_admin_events = []
+_coalesced_admin_lock = threading.Lock()
+
+
+def broadcast_to_admins_coalesced(event_type, data):
+    """Queue an admin event for the next coalesced 'batch' broadcast (order is preserved)"""
+    event = {
+        'type': event_type,
+        'data': data,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    with _coalesced_admin_lock:
+        _coalesced_admin_events.append(event)
+
+
+def _admin_coalesce_worker():
+    """Flush queued admin events every ADMIN_COALESCE_INTERVAL as one message"""
+    global _coalesced_admin_events
+    while True:
+        time.sleep(ADMIN_COALESCE_INTERVAL)
+        with _coalesced_admin_lock:
+            if not _coalesced_admin_events:
+                continue
+            events, _coalesced_admin_events = _coalesced_admin_events, []
+        
         try:
-            ws.send(message)
-        except Exception:
-            admin_connections.discard(ws)
+            if len(events) == 1:
+                message = json_dumps(events[0])
+            else:
+                message = json_dumps({
+                    'type': 'batch',
+                    'data': {'events': events},
+                    'timestamp': events[-1]['timestamp']
+                })
+            _publish_admin_message(message)
+        except Exception as e:
+            print(f"❌ Error in admin coalesce worker: {e}")
+
+
+threading.Thread(target=_admin_coalesce_worker, daemon=True, name='admin-coalescer').start()
 
 
 def notify_customer(customer_id, event_type, data):
     """Send notification to specific customer"""
-    if customer_id in customer_connections:
-        ws = customer_connections[customer_id]
-        try:
-            ws.send(json.dumps({
-                'type': event_type,
-                'data': data,
-                'timestamp': datetime.utcnow().isoformat()
-            }))
-        except Exception:
-            del customer_connections[customer_id]
+    # Without Redis only local sockets can be reached, so skip offline customers early
+    if _redis_client is None and customer_id not in customer_connections:
+        return
+    
+    message = json_dumps({
+        'type': event_type,
+        'data': data,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+    
+    if _publish_customer_messages([(customer_id, message)]):
+        return
+    _enqueue_send(_send_to_customer, customer_id, message)
 
 
-def notify_quantity_change(item, old_quantity, new_quantity):
-    """Helper function to notify about quantity changes and save to database"""
+def notify_customers(event_type, notifications):
+    """
+    Send the same event type to many customers as a single broadcast job.
+    Offline customers are skipped before anything is serialized.
+    
+    Args:
+        event_type: Message type sent to every customer
+        notifications: Iterable of (customer_id, data) pairs
+    """
+    if _redis_client is not None:
+        # The customer may be connected to another process, so publish every message
+        notifications = list(notifications)
+        timestamp = datetime.utcnow().isoformat()
+        if _publish_customer_messages(
+            (customer_id, json_dumps({'type': event_type, 'data': data, 'timestamp': timestamp}))
+            for customer_id, data in notifications
+        ):
+            return
+    
+    with connections_lock:
+        targets = [
+            (customer_id, customer_connections[customer_id], data)
+            for customer_id, data in notifications
+            if customer_id in customer_connections
+        ]
+    if not targets:
+        return
+    
+    timestamp = datetime.utcnow().isoformat()
+    messages = [
+        (customer_id, ws, json_dumps({'type': event_type, 'data': data, 'timestamp': timestamp}))
+        for customer_id, ws, data in targets
+    ]
+    _enqueue_send(_send_to_customers, messages)
+
+
+def notify_quantity_change(item, old_quantity, new_quantity, commit=True, coalesce=False):
+    """
+    Helper function to notify about quantity changes and save to database
+    
+    Args:
+        commit: If False, the change log is only added to the session and the
+            caller commits it with the rest of its batch
+        coalesce: If True, the admin event goes out with the next coalesced batch
+    """
     quantity_delta = new_quantity - old_quantity
     if quantity_delta != 0:
         # Get freshness score if available
@@ -71,7 +545,8 @@ def notify_quantity_change(item, old_quantity, new_quantity):
                 freshness_score=freshness_score
             )
             db.session.add(change_log)
-            db.session.commit()
+            if commit:
+                commit_session()
         except Exception as e:
             print(f"Error saving quantity change log: {e}")
             db.session.rollback()
@@ -85,7 +560,8 @@ def notify_quantity_change(item, old_quantity, new_quantity):
         }
         
         # Send specific quantity change event
-        broadcast_to_admins('quantity_changed', {
+        broadcast = broadcast_to_admins_coalesced if coalesce else broadcast_to_admins
+        broadcast('quantity_changed', {
             'inventory_id': item.id,
             'fruit_type': item.fruit_type,
             'old_quantity': old_quantity,
@@ -101,23 +577,38 @@ def notify_quantity_change(item, old_quantity, new_quantity):
     return item.to_dict()
 
 
-def update_freshness_for_item(inventory_id, freshness_score):
+def update_freshness_for_item(inventory_id, freshness_score, now=None):
     """
     Helper function to update freshness score for an inventory item and apply price discount.
     Called from video stream processing.
+    
+    Args:
+        inventory_id: ID of the inventory item
+        freshness_score: Freshness score (0-1.0 scale)
+        now: Optional timestamp shared with the caller (defaults to utcnow)
     """
+    if now is None:
+        now = datetime.utcnow()
+    
     try:
+        # Load the item and its freshness row in one query
+        inventory = db.session.get(
+            FruitInventory, inventory_id, options=[joinedload(FruitInventory.freshness)]
+        )
+        
         # Get or create freshness status
-        freshness = FreshnessStatus.query.filter_by(inventory_id=inventory_id).first()
+        freshness = inventory.freshness if inventory else FreshnessStatus.query.filter_by(inventory_id=inventory_id).first()
         
         if not freshness:
             freshness = FreshnessStatus(inventory_id=inventory_id)
             db.session.add(freshness)
+            if inventory:
+                inventory.freshness = freshness
         
         # Update freshness data
         freshness.freshness_score = freshness_score
         freshness.confidence_level = 0.9  # Default confidence for video stream
-        freshness.last_checked = datetime.utcnow()
+        freshness.last_checked = now
         
         # Calculate discount and status using the existing formula
         old_discount = freshness.discount_percentage
@@ -125,7 +616,6 @@ def update_freshness_for_item(inventory_id, freshness_score):
         freshness.update_status()
         
         # Update inventory price based on discount formula
-        inventory = FruitInventory.query.get(inventory_id)
         if inventory:
             # Apply discount: lower freshness = higher discount = lower price
             new_price = round(
@@ -133,7 +623,7 @@ def update_freshness_for_item(inventory_id, freshness_score):
                 2
             )
             inventory.current_price = new_price
-            inventory.updated_at = datetime.utcnow()
+            inventory.updated_at = now
             
             # Broadcast freshness update
             broadcast_to_admins('freshness_updated', {
@@ -159,6 +649,217 @@ def update_freshness_for_item(inventory_id, freshness_score):
         # Don't raise - allow processing to continue
 
 
+# ============ Micro-batched Freshness Writes ============
+# Camera freshness scores land in _pending_freshness (latest score per item
+# wins) and a flusher thread writes them every FRESHNESS_FLUSH_INTERVAL in one
+# transaction, instead of a SELECT+UPDATE+COMMIT round-trip per detection.
+FRESHNESS_FLUSH_INTERVAL = 0.25  # seconds
+_pending_freshness = {}  # {inventory_id: (freshness_score, confidence, predicted_expiry)}
+_pending_freshness_lock = threading.Lock()
+
+
+def queue_freshness_update(inventory_id, freshness_score, confidence=0.9, predicted_expiry=None):
+    """
+    Queue a freshness score for the next micro-batch flush.
+    
+    Args:
+        inventory_id: ID of the inventory item
+        freshness_score: Freshness score (0-1.0 scale)
+        confidence: Detection confidence (defaults to the video stream default)
+        predicted_expiry: Optional predicted expiry datetime
+    """
+    with _pending_freshness_lock:
+        _pending_freshness[inventory_id] = (freshness_score, confidence, predicted_expiry)
+
+
+# Dialects whose insert() supports ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+_FRESHNESS_UPSERT_COLUMNS = (
+    'freshness_score', 'confidence_level', 'last_checked',
+    'predicted_expiry_date', 'discount_percentage', 'status'
+)
+
+
+def _upsert_freshness_rows(rows):
+    """
+    Insert or update FreshnessStatus rows (keyed by the unique inventory_id) in one statement.
+    
+    Args:
+        rows: List of dicts with inventory_id and every _FRESHNESS_UPSERT_COLUMNS key
+    
+    Returns:
+        dict: {inventory_id: freshness_status id}, or None if the database can't
+        upsert with RETURNING (the caller falls back to separate UPDATE/INSERT)
+    """
+    dialect = db.session.get_bind().dialect
+    make_insert = _UPSERT_INSERTS.get(dialect.name)
+    if make_insert is None or not getattr(dialect, 'insert_returning', False):
+        return None
+    
+    stmt = make_insert(FreshnessStatus).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['inventory_id'],
+        set_={column: stmt.excluded[column] for column in _FRESHNESS_UPSERT_COLUMNS}
+    ).returning(FreshnessStatus.inventory_id, FreshnessStatus.id)
+    return dict(db.session.execute(stmt).all())
+
+
+def flush_freshness_updates(batch):
+    """
+    Write a batch of freshness scores in one transaction and broadcast once.
+    Must run inside an app context.
+    
+    Args:
+        batch: {inventory_id: (freshness_score, confidence, predicted_expiry)}
+    """
+    if not batch:
+        return
+    
+    now = datetime.utcnow()
+    ids = list(batch.keys())
+    # Items and their current freshness rows in one query
+    inventories = {
+        i.id: i
+        for i in FruitInventory.query.outerjoin(FruitInventory.freshness).options(
+            contains_eager(FruitInventory.freshness)
+        ).filter(FruitInventory.id.in_(ids))
+    }
+    
+    status_rows = []
+    price_rows = []
+    statuses = []  # (status, existing row or None)
+    updates = []
+    recommend_ids = []
+    
+    for inventory_id, (freshness_score, confidence, predicted_expiry) in batch.items():
+        inventory = inventories.get(inventory_id)
+        if inventory is None:
+            continue  # Item deleted since the score was queued
+        
+        current = inventory.freshness
+        old_discount = current.discount_percentage if current else 0.0
+        
+        # Detached status object used to compute discount/status and build the payload
+        status = FreshnessStatus(
+            inventory_id=inventory_id,
+            freshness_score=freshness_score,
+            confidence_level=confidence,
+            last_checked=now,
+            predicted_expiry_date=predicted_expiry or (current.predicted_expiry_date if current else None),
+            image_url=current.image_url if current else None,
+            notes=current.notes if current else None
+        )
+        status.discount_percentage = status.calculate_discount()
+        status.update_status()
+        
+        status_rows.append({
+            'inventory_id': inventory_id,
+            'freshness_score': status.freshness_score,
+            'confidence_level': status.confidence_level,
+            'last_checked': now,
+            'predicted_expiry_date': status.predicted_expiry_date,
+            'discount_percentage': status.discount_percentage,
+            'status': status.status
+        })
+        statuses.append((status, current))
+        
+        # Apply discount: lower freshness = higher discount = lower price
+        new_price = round(inventory.original_price * (1 - status.discount_percentage / 100), 2)
+        price_rows.append({'id': inventory_id, 'current_price': new_price, 'updated_at': now})
+        
+        item_data = inventory.to_dict(include_freshness=False)
+        item_data['current_price'] = new_price
+        item_data['updated_at'] = now.isoformat()
+        item_data['discount_percentage'] = (
+            round((inventory.original_price - new_price) / inventory.original_price * 100, 2)
+            if inventory.original_price > 0 else 0
+        )
+        updates.append((inventory, status, item_data, old_discount))
+    
+    with write_transaction():
+        # One INSERT ... ON CONFLICT DO UPDATE for every status row where supported
+        status_ids = _upsert_freshness_rows(status_rows) if status_rows else {}
+        if status_ids is not None:
+            for status, _ in statuses:
+                status.id = status_ids.get(status.inventory_id)
+        else:
+            freshness_rows = []
+            for (status, current), row in zip(statuses, status_rows):
+                if current:
+                    status.id = current.id
+                    freshness_rows.append(dict(row, id=current.id))
+                else:
+                    db.session.add(status)
+            if freshness_rows:
+                db.session.bulk_update_mappings(FreshnessStatus, freshness_rows)
+        if price_rows:
+            db.session.bulk_update_mappings(FruitInventory, price_rows)
+    if status_rows:
+        # Core/bulk writes skip the mapper hooks that normally clear the cached counts
+        invalidate_admin_stats()
+    
+    # Read ids/names from the pre-commit snapshot; the committed instances are expired
+    # and touching them would reload each item
+    payload = []
+    for inventory, status, item_data, old_discount in updates:
+        freshness_data = status.to_dict()
+        item_data['freshness'] = freshness_data
+        payload.append({
+            'inventory_id': item_data['id'],
+            'freshness': freshness_data,
+            'item': item_data
+        })
+        
+        # Send alert if critical (several can fire per flush, so they share one message)
+        if status.status == 'critical':
+            broadcast_to_admins_coalesced('freshness_alert', {
+                'message': f'Item {item_data["fruit_type"]} is in critical condition!',
+                'inventory_id': item_data['id'],
+                'freshness_score': status.freshness_score
+            })
+        
+        # Trigger recommendations if new discount is significant
+        if status.discount_percentage > old_discount and status.discount_percentage >= 20:
+            recommend_ids.append(item_data['id'])
+    
+    if payload:
+        broadcast_to_admins('freshness_batch_updated', {'updates': payload})
+    
+    # The AI path is rate limited to one call per AI_RECOMMENDATION_INTERVAL, so at most
+    # one of these items could get a call; schedule just that one instead of a thread each
+    if recommend_ids:
+        generate_recommendations_for_item(recommend_ids[0], algorithm=False, rate_limited=True)
+
+
+def _freshness_flush_worker():
+    """Drain pending freshness scores every FRESHNESS_FLUSH_INTERVAL and write them"""
+    app_context = None
+    while True:
+        time.sleep(FRESHNESS_FLUSH_INTERVAL)
+        if not _app_instance:
+            continue
+        
+        if app_context is None:
+            # Held for the thread's lifetime so the session isn't rebuilt per flush
+            app_context = _app_instance.app_context()
+            app_context.push()
+        
+        with _pending_freshness_lock:
+            if not _pending_freshness:
+                continue
+            batch = dict(_pending_freshness)
+            _pending_freshness.clear()
+        
+        try:
+            flush_freshness_updates(batch)
+        except Exception as e:
+            print(f"❌ Error flushing freshness updates: {e}")
+            db.session.rollback()
+
+
+threading.Thread(target=_freshness_flush_worker, daemon=True, name='freshness-flusher').start()
+
+
 def _generate_recommendations_with_ai(inventory_id):
     """Generate recommendations using xAI (Grok)"""
     try:
@@ -167,7 +868,7 @@ def _generate_recommendations_with_ai(inventory_id):
             raise ValueError("XAI_API_KEY environment variable not set")
         
         # Get the item
-        item = FruitInventory.query.get(inventory_id)
+        item = db.session.get(FruitInventory, inventory_id, options=[joinedload(FruitInventory.freshness)])
         if not item or not item.freshness:
             return []
         
@@ -179,12 +880,15 @@ def _generate_recommendations_with_ai(inventory_id):
         customers = Customer.query.all()
         if not customers:
             return []
+        customer_ids = {customer.id for customer in customers}
         
-        # Get all discounted items (for context)
-        all_discounted_items = FruitInventory.query.join(FreshnessStatus).filter(
+        # Get discounted items (for context), with freshness from the same join
+        all_discounted_items = FruitInventory.query.join(FruitInventory.freshness).options(
+            contains_eager(FruitInventory.freshness)
+        ).filter(
             FreshnessStatus.discount_percentage >= 15,
             FruitInventory.quantity > 0
-        ).all()
+        ).limit(10).all()
         
         # Format customer data
         customers_data = []
@@ -222,7 +926,7 @@ def _generate_recommendations_with_ai(inventory_id):
         
         # Format available items for context
         available_items = []
-        for avail_item in all_discounted_items[:10]:  # Limit to top 10 for context
+        for avail_item in all_discounted_items:  # Limited to 10 for context
             if avail_item.freshness:
                 available_items.append({
                     'fruit_type': avail_item.fruit_type,
@@ -339,9 +1043,8 @@ Only return valid JSON, no additional text."""
             priority_score = rec.get('priority_score', item.freshness.discount_percentage)
             reason_text = rec.get('reason', 'AI recommendation')
             
-            # Verify customer exists
-            customer = Customer.query.get(customer_id)
-            if not customer:
+            # Verify customer exists (against the customers already loaded)
+            if customer_id not in customer_ids:
                 continue
             
             # Create recommendation
@@ -364,7 +1067,7 @@ Only return valid JSON, no additional text."""
             db.session.add(recommendation)
             created_recommendations.append((customer_id, recommendation))
         
-        db.session.commit()
+        commit_session()
         
         # Notify customers
         for customer_id, recommendation in created_recommendations:
@@ -383,53 +1086,121 @@ Only return valid JSON, no additional text."""
 
 def _generate_recommendations_simple(inventory_id):
     """Generate recommendations using simple matching algorithm"""
+    return _generate_recommendations_simple_bulk([inventory_id])
+
+
+def _preferences_json():
+    """
+    Customer.preferences (a Text column) as a JSON expression for path lookups.
+    PostgreSQL needs an explicit CAST to JSON; SQLite's JSON functions read the text
+    as is, and CAST(... AS JSON) there would apply NUMERIC affinity and yield 0.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return cast(Customer.preferences, db.JSON)
+    return type_coerce(Customer.preferences, db.JSON)
+
+
+def _generate_recommendations_simple_bulk(item_ids=None, min_discount=15):
+    """
+    Generate algorithm recommendations for several items at once.
+    The customer/item match runs as one SQL query over customer_favorites,
+    then every recommendation is written with one INSERT and one commit.
+    
+    Args:
+        item_ids: IDs of the inventory items, or None for every item discounted by at least min_discount
+        min_discount: Minimum discount percentage an item needs to be recommended
+    """
     try:
-        item = FruitInventory.query.get(inventory_id)
-        if not item or not item.freshness:
-            return []
+        # Only recommend if there's a decent discount. Without item_ids the candidate
+        # set is just this filter, so it stays in SQL instead of a long IN list.
+        candidate_filters = [FreshnessStatus.discount_percentage >= min_discount]
+        if item_ids is not None:
+            candidate_filters.append(FruitInventory.id.in_(item_ids))
         
-        # Only recommend if there's a decent discount
-        if item.freshness.discount_percentage < 15:
+        items = FruitInventory.query.join(FruitInventory.freshness).options(
+            contains_eager(FruitInventory.freshness)
+        ).filter(*candidate_filters).all()
+        if not items:
             return []
+        items_by_id = {item.id: item for item in items}
         
-        # Find customers who like this fruit type
-        customers = Customer.query.all()
-        created_recommendations = []
+        # Match (customer, item) pairs in SQL: favorite fruit, price cap and
+        # discount threshold, with the same defaults as Customer preferences
+        prefs = _preferences_json()
+        max_price = func.coalesce(prefs['max_price'].as_float(), 10.0)
+        preferred_discount = func.coalesce(prefs['preferred_discount'].as_float(), 20)
+        matches = db.session.execute(
+            select(CustomerFavorite.customer_id, FruitInventory.id)
+            .join(FruitInventory, FruitInventory.fruit_type == CustomerFavorite.fruit_type)
+            .join(FreshnessStatus, FreshnessStatus.inventory_id == FruitInventory.id)
+            .join(Customer, Customer.id == CustomerFavorite.customer_id)
+            .where(
+                *candidate_filters,
+                FruitInventory.current_price <= max_price,
+                FreshnessStatus.discount_percentage >= preferred_discount
+            )
+            .order_by(FruitInventory.id, CustomerFavorite.customer_id)
+        ).all()
         
-        for customer in customers:
-            prefs = customer.get_preferences()
-            favorite_fruits = prefs.get('favorite_fruits', [])
-            max_price = prefs.get('max_price', 10.0)
-            preferred_discount = prefs.get('preferred_discount', 20)
-            
-            # Check if this item matches customer preferences
-            if (item.fruit_type in favorite_fruits and 
-                item.current_price <= max_price and
-                item.freshness.discount_percentage >= preferred_discount):
-                
-                # Create recommendation
-                recommendation = Recommendation(
-                    customer_id=customer.id,
-                    inventory_id=inventory_id,
-                    priority_score=item.freshness.discount_percentage
-                )
-                
-                recommendation.set_reason({
+        sent_at = datetime.utcnow()
+        mappings = []
+        reasons = {}  # {inventory_id: (reason dict, reason JSON)}
+        for customer_id, item_id in matches:
+            item = items_by_id[item_id]
+            discount = item.freshness.discount_percentage
+            if item_id not in reasons:
+                reason = {
                     'match_type': 'favorite_fruit',
                     'fruit': item.fruit_type,
-                    'discount': item.freshness.discount_percentage,
+                    'discount': discount,
                     'price': item.current_price,
                     'original_price': item.original_price,
                     'reasoning': 'Algorithm said so'
-                })
-                
-                db.session.add(recommendation)
-                created_recommendations.append((customer.id, recommendation))
-                
-                # Notify customer
-                notify_customer(customer.id, 'new_recommendation', recommendation.to_dict())
+                }
+                # Same reason for every matched customer, so serialize it once per item
+                reasons[item_id] = (reason, json.dumps(reason))
+            
+            mappings.append({
+                'customer_id': customer_id,
+                'inventory_id': item_id,
+                'reason': reasons[item_id][1],
+                'priority_score': discount,
+                'sent_at': sent_at,
+                'viewed': False,
+                'purchased': False
+            })
+        
+        if not mappings:
+            return []
         
-        db.session.commit()
+        # One multi-row INSERT ... RETURNING instead of a round-trip per recommendation
+        with write_transaction():
+            rec_ids = db.session.execute(
+                insert(Recommendation).returning(Recommendation.id, sort_by_parameter_order=True),
+                mappings
+            ).scalars().all()
+        
+        items_data = {
+            item.id: item.to_dict(include_freshness=True)
+            for item in items if item.id in reasons
+        }
+        created_recommendations = []
+        for rec_id, mapping in zip(rec_ids, mappings):
+            item_id = mapping['inventory_id']
+            rec_data = {
+                'id': rec_id,
+                'customer_id': mapping['customer_id'],
+                'inventory_id': item_id,
+                'priority_score': mapping['priority_score'],
+                'sent_at': sent_at.isoformat(),
+                'viewed': False,
+                'purchased': False,
+                'reason': reasons[item_id][0],
+                'item': items_data[item_id]
+            }
+            created_recommendations.append((mapping['customer_id'], rec_data))
+        
+        notify_customers('new_recommendation', created_recommendations)
         return created_recommendations
     
     except Exception as e:
@@ -439,8 +1210,6 @@ def _generate_recommendations_simple(inventory_id):
 
 
 # Store app reference for threading (set by main.py)
-_app_instance = None
-
 def set_app_instance(app):
     """Set the Flask app instance for use in threads"""
     global _app_instance
@@ -483,6 +1252,46 @@ def _generate_recommendations_threaded(inventory_id, algorithm, rate_limited):
             traceback.print_exc()
 
 
+def _generate_recommendations_bulk_threaded(item_ids, min_discount):
+    """Internal function to run bulk recommendation generation in a thread with app context"""
+    if not _app_instance:
+        print("❌ App instance not set, cannot run recommendation in thread")
+        return
+    
+    with _app_instance.app_context():
+        try:
+            _generate_recommendations_simple_bulk(item_ids, min_discount)
+        except Exception as e:
+            print(f"❌ Error in recommendation thread: {e}")
+            import traceback
+            traceback.print_exc()
+
+
+def generate_recommendations_bulk(item_ids=None, threaded=True, min_discount=15):
+    """
+    Generate algorithm recommendations for many discounted items in one pass
+    
+    Args:
+        item_ids: IDs of the inventory items, or None for every item discounted by at least min_discount
+        threaded: If True, run in one background thread (non-blocking). If False, run synchronously.
+        min_discount: Minimum discount percentage an item needs to be recommended
+    """
+    if item_ids is not None:
+        item_ids = list(item_ids)
+        if not item_ids:
+            return []
+    
+    if threaded:
+        thread = threading.Thread(
+            target=_generate_recommendations_bulk_threaded,
+            args=(item_ids, min_discount),
+            daemon=True
+        )
+        thread.start()
+        return []
+    return _generate_recommendations_simple_bulk(item_ids, min_discount)
+
+
 def generate_recommendations_for_item(inventory_id, algorithm=True, rate_limited=False, threaded=True):
     """
     Generate recommendations for a discounted item
@@ -493,7 +1302,14 @@ def generate_recommendations_for_item(inventory_id, algorithm=True, rate_limited
         rate_limited: If True and algorithm=False, only call AI if enough time has passed since last call
         threaded: If True, run in background thread (non-blocking). If False, run synchronously.
     """
+    global _last_ai_call_time
+    
     if threaded:
+        # Rate-limited AI calls that would be skipped anyway don't need a thread
+        # (the thread still claims the slot under the lock)
+        if not algorithm and rate_limited and time.time() - _last_ai_call_time < AI_RECOMMENDATION_INTERVAL:
+            return []
+        
         # Run in background thread
         thread = threading.Thread(
             target=_generate_recommendations_threaded,
@@ -508,8 +1324,6 @@ def generate_recommendations_for_item(inventory_id, algorithm=True, rate_limited
             return _generate_recommendations_simple(inventory_id)
         else:
             if rate_limited:
-                global _last_ai_call_time
-                
                 with _ai_call_lock:
                     current_time = time.time()
                     time_since_last_call = current_time - _last_ai_call_time
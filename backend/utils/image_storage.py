@@ -4,6 +4,7 @@ Stores images when detection counter changes - replaces folder contents with new
 """
 
 import os
+import logging
 import cv2
 import numpy as np
 from datetime import datetime
@@ -11,12 +12,41 @@ from pathlib import Path
 from typing import List, Optional
 import json
 
+from utils.log import get_logger
+
+# orjson writes metadata without the pretty-printing cost; fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = get_logger('image_storage')
+
 
 # Base directory for storing detection images
 # Use absolute path relative to this file's location
 DETECTION_IMAGES_DIR = Path(__file__).parent.parent / "detection_images"
 
 
+def write_metadata(metadata_path: Path, metadata: dict):
+    """
+    Write a metadata JSON file atomically (temp file + rename), so a crash
+    mid-write never leaves a truncated file next to its image.
+    
+    Args:
+        metadata_path: Destination .json path
+        metadata: Metadata dict; values JSON can't encode are stored as str()
+    """
+    if orjson is not None:
+        data = orjson.dumps(metadata, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(metadata, default=str).encode('utf-8')
+    
+    tmp_path = metadata_path.with_suffix('.json.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, metadata_path)
+
+
 def ensure_category_directory(category: str) -> Path:
     """
     Ensure the directory for a category exists.
@@ -57,9 +87,7 @@ def save_processed_image(cropped_image: np.ndarray, category: str, metadata: Opt
         
         # Save metadata if provided
         if metadata:
-            metadata_path = image_path.with_suffix('.json')
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2, default=str)
+            write_metadata(image_path.with_suffix('.json'), metadata)
         
         relative_path = f"detection_images/{category.lower()}/{filename}"
         return relative_path
@@ -102,9 +130,7 @@ def replace_category_images(cropped_images: List[tuple], category: str) -> List[
             
             # Save metadata if provided
             if metadata:
-                metadata_path = category_dir / f"{timestamp}_{idx}.json"
-                with open(metadata_path, 'w') as f:
-                    json.dump(metadata, f, indent=2, default=str)
+                write_metadata(category_dir / f"{timestamp}_{idx}.json", metadata)
             
             saved_paths.append(f"detection_images/{category.lower()}/{filename}")
         
@@ -168,14 +194,13 @@ def get_category_images(category: str) -> List[dict]:
     """
     try:
         category_dir = ensure_category_directory(category)
-        print(f"\n📂 [get_category_images] Looking for images in: {category_dir}")
-        print(f"    Directory exists: {category_dir.exists()}")
+        logger.debug("📂 [get_category_images] Looking for images in: %s", category_dir)
         
         images = []
         image_files = list(category_dir.glob("*.jpg"))
-        print(f"    Found {len(image_files)} .jpg files")
-        if image_files:
-            print(f"    Filenames: {[f.name for f in image_files[:5]]}")
+        logger.debug("    Found %s .jpg files", len(image_files))
+        if image_files and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("    Filenames: %s", [f.name for f in image_files[:5]])
         
         # Sort by modification time (newest first)
         image_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
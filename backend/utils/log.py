@@ -0,0 +1,55 @@
+"""
+Loggers for per-item diagnostics (per image, per detection, per request loop).
+These used to be print() calls; as debug logs they cost nothing unless enabled.
+Set LOG_LEVEL=DEBUG to see them (or WARNING to hide per-connection messages).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+_root_logger = logging.getLogger('suscart')
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    # Records are handed to a listener thread through a queue, so socket handlers and
+    # frame loops never block on the stderr write
+    _log_queue = queue.SimpleQueue()
+    _root_logger.addHandler(QueueHandler(_log_queue))
+    _listener = QueueListener(_log_queue, _handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    _root_logger.setLevel(LOG_LEVEL)
+    _root_logger.propagate = False
+
+_rate_limit_lock = threading.Lock()
+_rate_limit_state = {}  # {key: (last_emit_time, suppressed_count)}
+
+
+def get_logger(name):
+    """Return the 'suscart.<name>' logger"""
+    return logging.getLogger(f'suscart.{name}')
+
+
+def warn_rate_limited(logger, key, message, *args, interval=5.0):
+    """
+    Log a warning at most once per interval seconds for key; repeats in between
+    are counted and reported with the next one that gets through.
+    Meant for errors that can recur on every frame.
+    """
+    now = time.monotonic()
+    with _rate_limit_lock:
+        last, suppressed = _rate_limit_state.get(key, (0.0, 0))
+        if now - last < interval:
+            _rate_limit_state[key] = (last, suppressed + 1)
+            return
+        _rate_limit_state[key] = (now, 0)
+    if suppressed:
+        message += f' ({suppressed} similar suppressed)'
+    logger.warning(message, *args)
@@ -14,6 +14,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from models import db, FruitInventory, FreshnessStatus, Customer, PriceCurve, UserDiscountStat, ProductLCA
+    from sqlalchemy import func
+    from sqlalchemy.orm import selectinload
     MODELS_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️  Models not available: {e}")
@@ -88,15 +90,16 @@ def p_buy_user_beta(user_id: int, product_name: str, discount_pct: float) -> Tup
     if not MODELS_AVAILABLE:
         return 0.0, 0
     
-    user_stats = UserDiscountStat.query.filter_by(
-        user_id=user_id,
-        product_name=product_name
-    ).all()
-    
-    # Find matching bins
-    matches = [r for r in user_stats if r.bin_low <= discount_pct < r.bin_high]
-    trials = sum(r.trials for r in matches)
-    buys = sum(r.buys for r in matches)
+    # Sum the matching bins in SQL
+    trials, buys = db.session.query(
+        func.coalesce(func.sum(UserDiscountStat.trials), 0),
+        func.coalesce(func.sum(UserDiscountStat.buys), 0)
+    ).filter(
+        UserDiscountStat.user_id == user_id,
+        UserDiscountStat.product_name == product_name,
+        UserDiscountStat.bin_low <= discount_pct,
+        UserDiscountStat.bin_high > discount_pct
+    ).one()
     
     if trials == 0:
         return 0.0, 0
@@ -362,8 +365,9 @@ def compute_aggregate_impact(
         user_id = default_customer.id
         print(f"✅ [Markov Estimator] Using customer ID: {user_id}")
     
-    # Query inventory
-    query = FruitInventory.query.filter(FruitInventory.quantity > 0)
+    # Query inventory; freshness is preloaded so estimate_units_saved's lookups
+    # hit the identity map instead of lazy-loading one row per item
+    query = FruitInventory.query.options(selectinload(FruitInventory.freshness)).filter(FruitInventory.quantity > 0)
     if store_id:
         query = query.filter(FruitInventory.store_id == store_id)
     
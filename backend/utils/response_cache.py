@@ -0,0 +1,148 @@
+"""
+In-process TTL caches for read-mostly JSON endpoints and slow upstream APIs.
+Route responses are keyed by request path + query string and invalidated on writes.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, request
+
+
+# {key: (expires_at, body_bytes, status)}
+_cache = {}
+_cache_lock = threading.RLock()
+
+
+def cached(ttl=30):
+    """
+    Decorator that caches successful JSON responses of a route for ttl seconds.
+
+    Args:
+        ttl: Time to live in seconds for each cached response
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = request.full_path
+            now = time.monotonic()
+
+            with _cache_lock:
+                entry = _cache.get(key)
+            if entry and entry[0] > now:
+                _, body, status = entry
+                return Response(body, status=status, mimetype='application/json')
+
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                with _cache_lock:
+                    _cache[key] = (now + ttl, response.get_data(), response.status_code)
+            return response
+        return wrapper
+    return decorator
+
+
+def clear_prefix(prefix):
+    """
+    Drop every cached response whose key starts with prefix.
+
+    Args:
+        prefix: Route prefix to invalidate (e.g. '/api/stores')
+    """
+    with _cache_lock:
+        for key in [k for k in _cache if k.startswith(prefix)]:
+            del _cache[key]
+
+
+class TTLCache:
+    """
+    Small thread-safe cache whose entries expire after ttl seconds.
+    Used for idempotent upstream calls (e.g. Knot API) that are slow to repeat.
+    With stale_ttl set, get_or_load() keeps serving an expired entry for that much
+    longer while a background thread refreshes it (stale-while-revalidate).
+    """
+
+    def __init__(self, maxsize=1024, ttl=120, stale_ttl=0):
+        """
+        Args:
+            maxsize: Maximum number of entries kept (oldest evicted first)
+            ttl: Time to live in seconds for each entry
+            stale_ttl: Extra seconds an expired entry may be served while it is refreshed
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = {}  # {key: (expires_at, value)}
+        self._refreshing = set()  # keys with a background refresh in flight
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if entry[0] <= now:
+                if entry[0] + self.stale_ttl <= now:
+                    del self._data[key]
+                return None
+            return entry[1]
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for key, calling loader() on a miss.
+        Stale entries are returned immediately and refreshed in the background.
+        Results of None are not cached.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument callable producing the value
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    return entry[1]
+                if entry[0] + self.stale_ttl > now:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return entry[1]
+
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader):
+        """Reload key in the background; on failure the stale entry is kept until it ages out"""
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        except Exception as e:
+            print(f"⚠️ Background cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def set(self, key, value):
+        """Store value under key, evicting the oldest entry when full"""
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key):
+        """Drop the entry for key, if any"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
@@ -5,7 +5,8 @@ Based on scientific data and industry standards
 """
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from sqlalchemy import func
+from sqlalchemy import case, func
+from sqlalchemy.orm import selectinload
 from models import db, FruitInventory, FreshnessStatus, PurchaseHistory, WasteLog, Recommendation
 
 # CO2 Emission Factors (kg CO2 per kg of food waste)
@@ -246,6 +247,8 @@ def calculate_impact_metrics(
     # Get all purchases with discounts
     purchases = query.join(FruitInventory).join(FreshnessStatus).filter(
         FreshnessStatus.discount_percentage > 0
+    ).options(
+        selectinload(PurchaseHistory.inventory).selectinload(FruitInventory.freshness)
     ).all()
     
     # Calculate waste prevented from discounted sales
@@ -281,39 +284,45 @@ def calculate_impact_metrics(
     
     all_items = inventory_query.all()
     
+    # Units sold per item, summed in SQL rather than loading every purchase row
+    sold_by_item = {}
+    if all_items:
+        sold_by_item = dict(
+            db.session.query(PurchaseHistory.inventory_id, func.sum(PurchaseHistory.quantity))
+            .filter(PurchaseHistory.inventory_id.in_([item.id for item in all_items]))
+            .group_by(PurchaseHistory.inventory_id)
+            .all()
+        )
+    
     total_baseline_waste_kg = 0.0
     for item in all_items:
         days_in_store = (end_date - item.arrival_date).days if item.arrival_date else 0
         baseline_waste = calculate_baseline_waste(
             item.fruit_type,
-            item.quantity + sum(p.quantity for p in item.purchases),  # Original quantity
+            item.quantity + (sold_by_item.get(item.id) or 0),  # Original quantity
             days_in_store
         )
         total_baseline_waste_kg += baseline_waste
     
-    # Calculate actual waste that occurred
-    waste_logs_query = WasteLog.query.filter(
+    # Calculate actual waste that occurred. Weight and CO2 are linear in quantity, so
+    # waste is summed per fruit type in SQL instead of looking up each log's item
+    waste_query = db.session.query(
+        FruitInventory.fruit_type, func.sum(WasteLog.quantity_wasted)
+    ).join(WasteLog.inventory).filter(
         WasteLog.logged_at >= start_date,
         WasteLog.logged_at <= end_date
     )
     
     if store_id:
-        waste_logs_query = waste_logs_query.join(FruitInventory).filter(
-            FruitInventory.store_id == store_id
-        )
-    
-    waste_logs = waste_logs_query.all()
+        waste_query = waste_query.filter(FruitInventory.store_id == store_id)
     
     total_actual_waste_kg = 0.0
     total_co2_emitted_kg = 0.0
     
-    for waste_log in waste_logs:
-        waste_kg, co2_kg = calculate_actual_waste_with_system(
-            waste_log.inventory_id,
-            waste_log.quantity_wasted
-        )
+    for fruit_type, quantity_wasted in waste_query.group_by(FruitInventory.fruit_type).all():
+        waste_kg = calculate_weight_from_quantity(fruit_type, quantity_wasted or 0)
         total_actual_waste_kg += waste_kg
-        total_co2_emitted_kg += co2_kg
+        total_co2_emitted_kg += calculate_co2_saved(fruit_type, waste_kg)
     
     # Calculate waste reduction percentage
     if total_baseline_waste_kg > 0:
@@ -330,9 +339,10 @@ def calculate_impact_metrics(
     if store_id:
         rec_query = rec_query.join(FruitInventory).filter(FruitInventory.store_id == store_id)
     
-    recommendations = rec_query.all()
-    recommendations_sent = len(recommendations)
-    recommendations_purchased = sum(1 for r in recommendations if r.purchased)
+    recommendations_sent, recommendations_purchased = rec_query.with_entities(
+        func.count(Recommendation.id),
+        func.coalesce(func.sum(case((Recommendation.purchased, 1), else_=0)), 0)
+    ).one()
     
     conversion_rate = (recommendations_purchased / recommendations_sent * 100) if recommendations_sent > 0 else 0.0
     
@@ -170,7 +170,6 @@ const AdminDashboard = () => {
   const [retryCount, setRetryCount] = useState(0);
 
   const canvasRef = useRef<HTMLCanvasElement>(null);
-  const pendingFrameMetaRef = useRef<FrameMeta | null>(null);
   const autoStartedRef = useRef(false);
   const wsRef = useRef<WebSocket | null>(null);
   const retryTimeoutRef = useRef<number | null>(null);
@@ -188,8 +187,6 @@ const AdminDashboard = () => {
       setConnectionError(null); // Clear errors when stream starts
     } else if (data.type === 'stopped') {
       setIsStreaming(false);
-    } else if (data.type === 'frame_meta') {
-      pendingFrameMetaRef.current = data;
     } else if (data.type === 'error') {
       // Handle backend errors (like camera issues)
       const errorMsg = data.message || 'Unknown error';
@@ -286,15 +283,23 @@ const AdminDashboard = () => {
   };
 
   const handleBinaryFrame = (arrayBuffer: ArrayBuffer) => {
-    const blob = new Blob([arrayBuffer], { type: 'image/jpeg' });
+    // Frame message layout: <uint32 LE meta length><meta JSON><JPEG bytes>
+    const metaLength = new DataView(arrayBuffer).getUint32(0, true);
+    const metaBytes = new Uint8Array(arrayBuffer, 4, metaLength);
+    let meta: FrameMeta | null = null;
+    try {
+      meta = JSON.parse(new TextDecoder().decode(metaBytes));
+    } catch (e) {
+      console.error('Failed to parse frame metadata:', e);
+    }
+
+    const blob = new Blob([new Uint8Array(arrayBuffer, 4 + metaLength)], { type: 'image/jpeg' });
     const imageUrl = URL.createObjectURL(blob);
 
-    const meta = pendingFrameMetaRef.current;
     if (meta) {
       displayFrame(imageUrl, meta.detections);
       setDetectionCount(meta.detections.length);
       setFps(meta.fps);
-      pendingFrameMetaRef.current = null;
     } else {
       displayFrame(imageUrl, []);
       setDetections([]);
@@ -766,6 +766,12 @@ const InventoryView = () => {
   };
 
   const handleWebSocketMessage = (data: any) => {
+    if (data.type === 'batch') {
+      // Camera-driven events are coalesced server-side; apply them in order
+      data.data.events.forEach((event: any) => handleWebSocketMessage(event));
+      return;
+    }
+    
     if (data.type === 'quantity_changed') {
       // Add to quantity changes log
       const change: QuantityChange = {
@@ -796,19 +802,20 @@ const InventoryView = () => {
           return prev;
         }
       });
-    } else if (data.type === 'freshness_updated') {
-      // Update freshness score in real-time
-      const inventoryId = data.data.inventory_id;
-      const freshness = data.data.freshness;
-      const item = data.data.item;
+    } else if (data.type === 'freshness_updated' || data.type === 'freshness_batch_updated') {
+      // Update freshness score in real-time (camera updates arrive batched)
+      const freshnessUpdates: any[] = data.type === 'freshness_batch_updated' ? data.data.updates : [data.data];
+      const updatesById = new Map(freshnessUpdates.map((u: any) => [u.inventory_id, u]));
       
       setInventory(prev => {
         const updated = prev.map(invItem => {
-          if (invItem.id === inventoryId) {
+          const update = updatesById.get(invItem.id);
+          if (update) {
+            const item = update.item;
             // Update freshness and also update price/discount if item data is provided
             return {
               ...invItem,
-              freshness: freshness,
+              freshness: update.freshness,
               // Update price and discount if provided in item data
               ...(item && {
                 current_price: item.current_price,
@@ -849,7 +856,7 @@ const InventoryView = () => {
         return updated;
       });
       
-      console.log(`Freshness updated for item ${inventoryId}: ${freshness.freshness_score}%`);
+      console.log(`Freshness updated for ${freshnessUpdates.length} item(s)`);
     } else if (data.type === 'inventory_added') {
       // Refresh inventory to get new item
       fetchInventory();